@@ -3,34 +3,32 @@
 Route module for the API
 """
 from os import getenv
-from api.v1.views import app_views
-from flask import Flask, jsonify, abort, request
-from flask_cors import (CORS, cross_origin)
+from api.v1.startup import startup
+with startup.phase('import flask'):
+    from flask import Flask, jsonify, abort, request
+    from flask_cors import (CORS, cross_origin)
+with startup.phase('import views'):
+    from api.v1.views import app_views
 import os
-from api.v1.auth.auth import Auth
+from api.v1.auth import load_auth
+from api.v1.metrics import metrics
+from models.user import User
 
+STARTUP_PATHS = ['/api/v1/status/', '/api/v1/ready/', '/api/v1/metrics/']
 
-app = Flask(__name__)
-app.register_blueprint(app_views)
-CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
+with startup.phase('create app'):
+    app = Flask(__name__)
+    app.register_blueprint(app_views)
+    CORS(app, resources={r"/api/v1/*": {"origins": "*"}})
 
-auth = None
+with startup.phase('load auth'):
+    auth = load_auth(getenv('AUTH_TYPE'))
 
-if getenv('AUTH_TYPE') == 'basic_auth':
-    from api.v1.auth.basic_auth import BasicAuth
-    auth = BasicAuth()
-elif getenv('AUTH_TYPE') == 'auth':
-    from api.v1.auth.auth import Auth
-    auth = Auth()
-elif getenv('AUTH_TYPE') == 'session_auth':
-    from api.v1.auth.session_auth import SessionAuth
-    auth = SessionAuth()
-elif getenv('AUTH_TYPE') == 'session_exp_auth':
-    from api.v1.auth.session_exp_auth import SessionExpAuth
-    auth = SessionExpAuth()
-elif getenv('AUTH_TYPE') == 'session_db_auth':
-    from api.v1.auth.session_db_auth import SessionDBAuth
-    auth = SessionDBAuth()
+if metrics.enabled:
+    metrics.instrument_app(app, auth)
+
+startup.load_models(User)
+startup.finish()
 
 
 @app.errorhandler(404)
@@ -64,6 +62,18 @@ def forbidden(error) -> str:
     return jsonify({"error": "Forbidden"}), 403
 
 
+@app.errorhandler(503)
+def unavailable(error) -> str:
+    """
+    Error handler for 503 Service Unavailable.
+    Args:
+        error: the error message.
+    Returns:
+        A JSON response with status code 503.
+    """
+    return jsonify({"error": "Service Unavailable"}), 503
+
+
 @app.before_request
 def before_request():
     """
@@ -71,7 +81,11 @@ def before_request():
     """
     excluded_paths = ['/api/v1/status/',
                       'api/v1/unauthorized/',
-                      '/api/v1/forbidden/', '/api/v1/auth_session/login/']
+                      '/api/v1/forbidden/', '/api/v1/auth_session/login/',
+                      '/api/v1/metrics/', '/api/v1/ready/']
+    if request.path.rstrip('/') + '/' not in STARTUP_PATHS and \
+            not startup.wait_ready():
+        abort(503)
     if auth is None or request.path in excluded_paths:
         return
     if not auth.require_auth(request.path, excluded_paths):
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the API
+Serves the same app_views routes and auth classes as api.v1.app, e.g.:
+    uvicorn api.v1.asgi:application --host 0.0.0.0 --port 5000
+"""
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from tempfile import SpooledTemporaryFile
+import asyncio
+import sys
+from api.v1.app import app
+
+
+def wsgi_environ(scope: dict, body) -> dict:
+    """
+    Build the WSGI environ of an ASGI HTTP request (PEP 3333)
+    Args:
+        scope: the ASGI connection scope
+        body: the file holding the request body
+    Returns:
+        dict: the WSGI environ
+    """
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf8").decode("latin1"),
+        "PATH_INFO": path.encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": "HTTP/{}".format(
+            scope.get("http_version", "1.1")),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        # the whole body is spooled, read it up to EOF without a length
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+        environ["REMOTE_PORT"] = str(scope["client"][1])
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = name
+        else:
+            key = "HTTP_" + name
+        if key in environ:
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            value = environ[key] + separator + value
+        environ[key] = value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ: dict) -> tuple:
+    """
+    Run a WSGI application to completion
+    Args:
+        wsgi_app: the WSGI application
+        environ: the WSGI environ
+    Returns:
+        tuple: the status code, the headers and the body
+    """
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+        return chunks.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        chunks.extend(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], b"".join(chunks)
+
+
+class AsgiApp:
+    """
+    ASGI application running the Flask app in an executor
+    Every request (password hashing, store flushes included) runs on a
+    worker thread of a dedicated executor, so the event loop keeps
+    accepting connections while a slow request is being handled. The
+    API answers small JSON documents, so responses are sent in one body
+    message once the view returns.
+    Attributes:
+        max_workers (int): size of the executor, from ASGI_WORKERS
+    """
+
+    def __init__(self, wsgi_app):
+        """
+        Initialize the ASGI application
+        Args:
+            wsgi_app: the WSGI application to serve
+        """
+        workers = getenv("ASGI_WORKERS", "")
+        self.max_workers = int(workers) if workers.isdigit() else None
+        self.executor = None
+        self.wsgi_app = wsgi_app
+
+    def _install_executor(self):
+        """
+        Create the request executor on first use
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="api-v1"
+            )
+
+    async def lifespan(self, receive, send):
+        """
+        Handle the ASGI lifespan protocol
+        Args:
+            receive: the ASGI receive callable
+            send: the ASGI send callable
+        """
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._install_executor()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.executor is not None:
+                    self.executor.shutdown(wait=True)
+                    self.executor = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        """
+        ASGI entry point
+        Args:
+            scope: the ASGI connection scope
+            receive: the ASGI receive callable
+            send: the ASGI send callable
+        """
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        self._install_executor()
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            status, headers, content = \
+                await asyncio.get_running_loop().run_in_executor(
+                    self.executor, call_wsgi, self.wsgi_app,
+                    wsgi_environ(scope, body))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.lower().encode("latin1"),
+                         value.encode("latin1"))
+                        for name, value in headers],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+application = AsgiApp(app)
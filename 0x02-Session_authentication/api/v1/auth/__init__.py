@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+""" Registry of the auth backends
+Backends are named by their AUTH_TYPE and imported on first use.
+"""
+from importlib import import_module
+from threading import Lock
+
+
+AUTH_BACKENDS = {
+    'auth': ('api.v1.auth.auth', 'Auth'),
+    'basic_auth': ('api.v1.auth.basic_auth', 'BasicAuth'),
+    'session_auth': ('api.v1.auth.session_auth', 'SessionAuth'),
+    'session_exp_auth': ('api.v1.auth.session_exp_auth', 'SessionExpAuth'),
+    'session_db_auth': ('api.v1.auth.session_db_auth', 'SessionDBAuth'),
+    'signed_session_auth': ('api.v1.auth.signed_session_auth',
+                            'SignedSessionAuth'),
+}
+_instances = {}
+_instances_lock = Lock()
+
+
+def register_auth(auth_type: str, module: str, class_name: str):
+    """ Register an auth backend class by module and class name
+    """
+    AUTH_BACKENDS[auth_type] = (module, class_name)
+
+
+def auth_class(auth_type: str) -> type:
+    """ Import and return the class of an auth backend
+    """
+    module, class_name = AUTH_BACKENDS[auth_type]
+    return getattr(import_module(module), class_name)
+
+
+def load_auth(auth_type: str):
+    """ Return the instance of an auth backend, created once
+    None if auth_type is None or unknown
+    """
+    if auth_type not in AUTH_BACKENDS:
+        return None
+    with _instances_lock:
+        if auth_type not in _instances:
+            _instances[auth_type] = auth_class(auth_type)()
+        return _instances[auth_type]
@@ -14,6 +14,32 @@ class Auth:
     Authentication class
     """
 
+    def __init__(self):
+        """
+        Initialize the Auth instance.
+        The session cookie name is resolved once here instead of on
+        every session_cookie call.
+        """
+        self.session_name = getenv("SESSION_NAME")
+
+    def _memoize(self, request, key: str, compute):
+        """
+        Compute a request-scoped value once per request.
+        Args:
+            request: the Flask request object holding the cache.
+            key: the name of the cached value.
+            compute: callable producing the value on a cache miss.
+        Returns:
+            The cached (or freshly computed) value.
+        """
+        context = getattr(request, '_auth_context', None)
+        if context is None:
+            context = {}
+            request._auth_context = context
+        if key not in context:
+            context[key] = compute()
+        return context[key]
+
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
         """
         Methods to determine if authentication is required for the path.
@@ -41,9 +67,10 @@ class Auth:
         Returns:
             The value of the Authorization header or None if not
         """
-        if request is None or 'Authorization' not in request.headers:
+        if request is None:
             return None
-        return request.headers['Authorization']
+        return self._memoize(request, 'authorization_header',
+                             lambda: request.headers.get('Authorization'))
 
     def current_user(self, request=None) -> TypeVar('User'):
         """
@@ -66,5 +93,5 @@ class Auth:
         if request is None:
             return None
 
-        session_name = getenv("SESSION_NAME")
-        return request.cookies.get(session_name)
+        return self._memoize(request, 'session_cookie',
+                             lambda: request.cookies.get(self.session_name))
@@ -6,6 +6,7 @@ Basic Authentication Module
 from api.v1.auth.auth import Auth
 from typing import TypeVar, List
 from models.user import User
+from api.v1.auth.rate_limiter import login_limiter
 import base64
 import binascii
 
@@ -79,7 +80,12 @@ class BasicAuth(Auth):
         """ overloads Auth's current_user method """
         if request is None:
             return None
-        auth_header = request.headers.get('Authorization')
+        return self._memoize(request, 'current_user',
+                             lambda: self._user_from_header(request))
+
+    def _user_from_header(self, request) -> TypeVar('User'):
+        """ Resolves the user from the Basic Authorization header """
+        auth_header = self.authorization_header(request)
         if (auth_header is None or
                 not isinstance(auth_header, str) or
                 not auth_header.startswith('Basic ')):
@@ -87,4 +93,13 @@ class BasicAuth(Auth):
         base64_part = self.extract_base64_authorization_header(auth_header)
         decoded_part = self.decode_base64_authorization_header(base64_part)
         email, pwd = self.extract_user_credentials(decoded_part)
-        return self.user_object_from_credentials(email, pwd)
+        if email is None:
+            return None
+        throttle_keys = (('email', email), ('ip', request.remote_addr))
+        # every API request carries the credentials, only failures count
+        if not login_limiter.allow(*throttle_keys, reserve=False):
+            return None
+        user = self.user_object_from_credentials(email, pwd)
+        if user is None:
+            login_limiter.hit(*throttle_keys)
+        return user
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Module of login attempt throttling
+"""
+
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket limiter of failed login attempts
+    Each key (an email or a client IP) owns a bucket of `capacity`
+    tokens refilled at `capacity / period` tokens per second. Every
+    attempt takes one token in allow(), under the same lock as the
+    check, and a successful one gives it back with refund(); once a
+    bucket is empty, attempts for that key are rejected before any
+    password is hashed, however many are in flight. Checks that must not
+    hold tokens, such as Basic auth on every API request, use
+    allow(reserve=False) and hit() on failure.
+    A bucket is a (tokens, timestamp) pair and at most `max_keys`
+    buckets are kept, the least recently used being evicted first.
+    """
+
+    def __init__(self, capacity: int = None, period: float = None,
+                 max_keys: int = None):
+        """
+        Initialize the limiter
+        Args:
+            capacity (int): failed attempts allowed per period,
+                from LOGIN_RATE_LIMIT by default
+            period (float): the period in seconds,
+                from LOGIN_RATE_PERIOD by default
+            max_keys (int): maximum number of tracked keys,
+                from LOGIN_RATE_MAX_KEYS by default
+        """
+        if capacity is None:
+            capacity = int(getenv("LOGIN_RATE_LIMIT", "5"))
+        if period is None:
+            period = float(getenv("LOGIN_RATE_PERIOD", "60"))
+        if max_keys is None:
+            max_keys = int(getenv("LOGIN_RATE_MAX_KEYS", "100000"))
+        self.capacity = capacity
+        self.rate = capacity / period if period > 0 else float("inf")
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def _tokens(self, key, now: float) -> float:
+        """
+        Return the refilled token count of a bucket
+        Args:
+            key: the bucket key
+            now (float): the current monotonic time
+        Returns:
+            float: the tokens left in the bucket
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        tokens, last = bucket
+        return min(self.capacity, tokens + (now - last) * self.rate)
+
+    def allow(self, *keys, reserve: bool = True) -> bool:
+        """
+        Take a token from the bucket of every given key, unless one of
+        them is empty
+        Args:
+            *keys: the keys of the attempt, None keys are ignored
+            reserve (bool): take the tokens; without, only check that
+                the buckets are not empty and charge failures with hit()
+        Returns:
+            bool: False if any bucket is empty, else True
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = {key: self._tokens(key, now)
+                      for key in keys if key is not None}
+            if any(left < 1 for left in tokens.values()):
+                return False
+            if reserve:
+                self._take(tokens, now)
+        return True
+
+    def hit(self, *keys) -> None:
+        """
+        Take a token for a failed attempt checked with reserve=False
+        Args:
+            *keys: the keys of the attempt, None keys are ignored
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._take({key: self._tokens(key, now)
+                        for key in keys if key is not None}, now)
+
+    def _take(self, tokens: dict, now: float) -> None:
+        """
+        Take one token from buckets, the lock being held
+        Args:
+            tokens (dict): key -> refilled token count of the buckets
+            now (float): the current monotonic time
+        """
+        for key, left in tokens.items():
+            self._buckets[key] = (max(left - 1, 0), now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+    def refund(self, *keys) -> None:
+        """
+        Give back the token taken by allow() for a successful attempt
+        Args:
+            *keys: the keys of the attempt, None keys are ignored
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key in self._buckets:
+                    self._buckets[key] = (
+                        min(self.capacity, self._tokens(key, now) + 1), now)
+
+    def reset(self, *keys) -> None:
+        """
+        Forget the failed attempts of every given key
+        Args:
+            *keys: the keys to reset
+        """
+        with self._lock:
+            for key in keys:
+                self._buckets.pop(key, None)
+
+
+login_limiter = RateLimiter()
@@ -4,6 +4,7 @@ Module that manage session Authentication
 """
 
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_map import session_map
 import uuid
 from typing import TypeVar
 from models.user import User
@@ -14,9 +15,10 @@ class SessionAuth(Auth):
     """
     Class for managing session authentication
     Attributes:
-        user_id_by_session_id (dict): Dictionary mapping session IDs to userID
+        user_id_by_session_id (dict): Dictionary mapping session IDs to userID,
+            a ShardedSessionMap when SESSION_SHARDS is greater than 1
     """
-    user_id_by_session_id = {}
+    user_id_by_session_id = session_map()
 
     def create_session(self, user_id: str = None) -> str:
         """
@@ -29,7 +31,10 @@ class SessionAuth(Auth):
         if user_id is None or not isinstance(user_id, str):
             return None
 
-        session_id = str(uuid.uuid4())
+        new_session_id = getattr(self.user_id_by_session_id,
+                                 'new_session_id', None)
+        session_id = new_session_id() if new_session_id \
+            else str(uuid.uuid4())
         self.user_id_by_session_id[session_id] = user_id
         return session_id
 
@@ -54,10 +59,24 @@ class SessionAuth(Auth):
         Return:
             User: the user object correspond to the current session
         """
+        if request is None:
+            return None
+        return self._memoize(request, 'current_user',
+                             lambda: self._user_from_cookie(request))
+
+    def _user_from_cookie(self, request):
+        """
+        Resolve the user from the session cookie of the request.
+        Args:
+            request: the request object contain the session ID
+        Return:
+            User: the user object correspond to the session, else None
+        """
         session_id = self.session_cookie(request)
-        user_id = self.user_id_for_session_id(session_id)
-        user = User.get(user_id)
-        return user
+        user_id = self._memoize(request, 'user_id',
+                                lambda: self.user_id_for_session_id(
+                                    session_id))
+        return User.get(user_id)
 
     def destroy_session(self, request=None) -> bool:
         """
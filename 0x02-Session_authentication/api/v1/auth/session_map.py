@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Module of the sharded session map
+Under the GIL the per-shard locks cost about 40% of the plain dict
+throughput (see benchmark.py), so SessionAuth keeps a plain dict unless
+SESSION_SHARDS is greater than 1.
+"""
+from collections.abc import MutableMapping
+from os import getenv
+from threading import Lock
+import uuid
+
+
+class ShardedSessionMap(MutableMapping):
+    """
+    Session ID -> session data mapping split over shards
+    Each shard is a dict with its own write lock, so writers on
+    different shards don't wait for each other and a dict resize only
+    touches one shard. Session IDs made by new_session_id() are uuid4
+    strings whose first two bytes are a generation tag and a shard tag:
+    "ggss....-....-4...-....-............", routing them costs no hash.
+    Other keys are routed by their hash. clear() starts a new
+    generation.
+    """
+
+    def __init__(self, shards: int = None):
+        """
+        Initialize an empty map
+        Args:
+            shards: number of shards, a power of two up to 256,
+              SESSION_SHARDS or 16 by default.
+        """
+        if shards is None:
+            shards = int(getenv("SESSION_SHARDS", "16"))
+        if shards < 1 or shards > 256 or shards & (shards - 1):
+            raise ValueError("shards must be a power of two up to 256")
+        self._mask = shards - 1
+        self._generation = 0
+        self._tag = "00"
+        self._shards = [{} for _ in range(shards)]
+        self._locks = [Lock() for _ in range(shards)]
+
+    def new_session_id(self) -> str:
+        """
+        Create a session ID tagged with the generation and a shard
+        Returns:
+            str: a uuid4 string.
+        """
+        session_id = str(uuid.uuid4())
+        shard = int(session_id[2:4], 16) & self._mask
+        return "{}{:02x}{}".format(self._tag, shard, session_id[4:])
+
+    def _index(self, key) -> int:
+        """ Shard index of a key
+        """
+        if type(key) is str and len(key) == 36 and \
+                key.startswith(self._tag):
+            try:
+                return int(key[2:4], 16) & self._mask
+            except ValueError:
+                pass
+        return hash(key) & self._mask
+
+    def __getitem__(self, key):
+        """ Session data of a session ID
+        """
+        return self._shards[self._index(key)][key]
+
+    def get(self, key, default=None):
+        """ Session data of a session ID, default if missing
+        """
+        return self._shards[self._index(key)].get(key, default)
+
+    def __contains__(self, key) -> bool:
+        """ True if the session ID is known
+        """
+        return key in self._shards[self._index(key)]
+
+    def __setitem__(self, key, value):
+        """ Store the session data of a session ID
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            self._shards[index][key] = value
+
+    def __delitem__(self, key):
+        """ Remove a session ID
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            del self._shards[index][key]
+
+    def pop(self, key, *default):
+        """ Remove a session ID and return its data
+        """
+        index = self._index(key)
+        with self._locks[index]:
+            return self._shards[index].pop(key, *default)
+
+    def __iter__(self):
+        """ Session IDs, shard by shard
+        """
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                keys = list(shard)
+            yield from keys
+
+    def __len__(self) -> int:
+        """ Number of sessions
+        """
+        return sum(len(shard) for shard in self._shards)
+
+    def clear(self):
+        """ Remove all sessions and start a new generation
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            self._generation = (self._generation + 1) % 256
+            self._tag = "{:02x}".format(self._generation)
+            for shard in self._shards:
+                shard.clear()
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def __repr__(self) -> str:
+        """ Representation of the map as a dict
+        """
+        items = {}
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                items.update(shard)
+        return repr(items)
+
+
+def session_map(shards: int = None):
+    """
+    Create the session store of SessionAuth
+    Args:
+        shards: number of shards, SESSION_SHARDS or 1 by default.
+    Returns:
+        a ShardedSessionMap if shards is greater than 1, else a dict.
+    """
+    if shards is None:
+        shards = int(getenv("SESSION_SHARDS", "1"))
+    return ShardedSessionMap(shards) if shards > 1 else {}
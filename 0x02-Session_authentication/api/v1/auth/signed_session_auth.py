@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Module of stateless signed session authentication
+"""
+
+from api.v1.auth.auth import Auth
+from models.user import User
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from os import getenv, urandom
+from threading import Lock
+from typing import TypeVar
+import binascii
+import hashlib
+import hmac
+import time
+
+
+class SignedSessionAuth(Auth):
+    """
+    Session authentication without a server-side session store.
+    The session cookie carries the user ID, an expiry timestamp and a
+    random nonce making every session ID unique, signed with
+    HMAC-SHA256:
+        <base64url(user_id)>.<expires_at>.<base64url(nonce)>.<base64url(signature)>
+    Validating a session is a signature check, no store lookup.
+    Attributes:
+        revoked (dict): signatures of logged-out sessions mapped to the
+            expiry of the session, pruned once expired.
+        revoked_before (dict): user ID -> expiry; once revoked holds
+            max_revoked live entries, a logout revokes every session of
+            the user expiring up to its own instead. Its size is bounded
+            by the number of users, so no revocation is ever dropped.
+    """
+    revoked = {}
+    revoked_before = {}
+    max_revoked = 10000
+    default_duration = 24 * 3600
+    _revoked_lock = Lock()
+
+    def __init__(self):
+        """
+        Initialize SignedSessionAuth instance
+        SESSION_SECRET must be shared by every worker; a random secret
+        is used when it is not set (sessions then die with the process).
+        """
+        super().__init__()
+        secret = getenv("SESSION_SECRET")
+        self.secret = secret.encode() if secret else urandom(32)
+        session_duration_str = getenv("SESSION_DURATION", "0")
+        self.session_duration = int(session_duration_str) \
+            if session_duration_str.isdigit() else 0
+        if self.session_duration <= 0:
+            self.session_duration = self.default_duration
+
+    def _sign(self, payload: bytes) -> bytes:
+        """
+        Compute the signature of a session payload
+        Args:
+            payload (bytes): the signed part of the session ID
+        Returns:
+            bytes: the raw HMAC-SHA256 digest
+        """
+        return hmac.new(self.secret, payload, hashlib.sha256).digest()
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Create a signed session ID for a given user ID
+        Args:
+            user_id (str): the user ID
+        Returns:
+            str: The signed session ID, else None
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+
+        # outlive a logout of the same second revoking the older sessions
+        expires_at = max(int(time.time()) + self.session_duration,
+                         self.revoked_before.get(user_id, 0) + 1)
+        payload = "{}.{}.{}".format(
+            urlsafe_b64encode(user_id.encode()).decode().rstrip("="),
+            expires_at,
+            urlsafe_b64encode(urandom(16)).decode().rstrip("=")
+        ).encode()
+        signature = urlsafe_b64encode(self._sign(payload)).rstrip(b"=")
+        return (payload + b"." + signature).decode()
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Retrieve the user ID carried by a signed session ID
+        Args:
+            session_id (str): The signed session ID
+        Returns:
+            str: The user ID if the signature is valid and the session
+                is neither expired nor revoked, else None
+        """
+        if session_id is None or not isinstance(session_id, str):
+            return None
+
+        parts = session_id.split(".")
+        if len(parts) != 4 or not parts[1].isdigit():
+            return None
+        encoded_user_id, expires_at, nonce, signature = parts
+        payload = "{}.{}.{}".format(encoded_user_id, expires_at,
+                                    nonce).encode()
+        expected = urlsafe_b64encode(self._sign(payload)).rstrip(b"=")
+        if not hmac.compare_digest(expected, signature.encode()):
+            return None
+
+        if int(expires_at) < time.time():
+            return None
+        if signature in self.revoked:
+            return None
+
+        try:
+            padding = "=" * (-len(encoded_user_id) % 4)
+            user_id = urlsafe_b64decode(encoded_user_id + padding).decode()
+        except (binascii.Error, UnicodeDecodeError):
+            return None
+        if int(expires_at) <= self.revoked_before.get(user_id, 0):
+            return None
+        return user_id
+
+    def current_user(self, request=None) -> TypeVar('User'):
+        """
+        Retrieve the current user based on the signed session cookie
+        Args:
+            request: the request object contain the session cookie
+        Return:
+            User: the user object correspond to the session, else None
+        """
+        if request is None:
+            return None
+        return self._memoize(request, 'current_user',
+                             lambda: User.get(self.user_id_for_session_id(
+                                 self.session_cookie(request))))
+
+    def destroy_session(self, request=None) -> bool:
+        """
+        Revoke the signed session of the request / logout
+        Args:
+            request: The request object
+        Returns:
+            bool: True if successfully revoked, else False
+        """
+        if request is None:
+            return False
+
+        session_id = self.session_cookie(request)
+        user_id = self.user_id_for_session_id(session_id)
+        if user_id is None:
+            return False
+
+        signature = session_id.rsplit(".", 1)[1]
+        expires_at = int(session_id.split(".")[1])
+        with self._revoked_lock:
+            if self._prune_revoked():
+                self.revoked[signature] = expires_at
+            else:
+                self.revoked_before[user_id] = max(
+                    expires_at, self.revoked_before.get(user_id, 0))
+        return True
+
+    def _prune_revoked(self) -> bool:
+        """
+        Drop the expired revocations if the map is full, the lock held
+        Returns:
+            bool: True if there is room for a new revocation
+        """
+        if len(self.revoked) < self.max_revoked:
+            return True
+        now = time.time()
+        for key, expiry in list(self.revoked.items()):
+            if expiry < now:
+                del self.revoked[key]
+        for key, expiry in list(self.revoked_before.items()):
+            if expiry < now:
+                del self.revoked_before[key]
+        return len(self.revoked) < self.max_revoked
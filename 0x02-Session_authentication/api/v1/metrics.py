@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Module of hot-path instrumentation
+Opt-in with API_METRICS=1: the auth steps of before_request, the model
+store operations, password hashing and the views are then wrapped with
+timers recording into per-stage histograms. When disabled nothing is
+wrapped, so the hot path runs the original functions.
+"""
+from functools import wraps
+from inspect import getattr_static
+from os import getenv
+from threading import Lock
+import time
+
+
+class Histogram:
+    """
+    Histogram of durations in power-of-two microsecond buckets
+    """
+    size = 32
+
+    def __init__(self):
+        """ Initialize an empty histogram
+        """
+        self.buckets = [0] * self.size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """ Record one duration
+        Args:
+            seconds (float): the measured duration
+        """
+        index = min(int(seconds * 1000000).bit_length(), self.size - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_json(self) -> dict:
+        """ Convert the histogram to a JSON dictionary
+        Returns:
+            dict: count, total/mean/max in ms and non-empty buckets
+                keyed by their upper bound in microseconds
+        """
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3)
+            if self.count else 0,
+            "max_ms": round(self.max * 1000, 3),
+            "buckets_us": {
+                "<{}".format(1 << index): n
+                for index, n in enumerate(self.buckets) if n
+            },
+        }
+
+
+class Metrics:
+    """
+    Registry of stage histograms
+    """
+
+    def __init__(self, enabled: bool = False):
+        """ Initialize the registry
+        Args:
+            enabled (bool): whether instrumentation is installed
+        """
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = Lock()
+
+    def record(self, stage: str, seconds: float):
+        """ Record a duration for a stage
+        Args:
+            stage (str): the stage name
+            seconds (float): the measured duration
+        """
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.record(seconds)
+
+    def timed(self, stage: str, func):
+        """ Wrap a function to record its duration
+        Args:
+            stage (str): the stage name
+            func: the function to wrap
+        Returns:
+            the wrapping function
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, owner, name: str, stage: str):
+        """ Replace an attribute of a class or an instance by a timed one
+        Classmethods, staticmethods and property setters are supported.
+        Args:
+            owner: the class or instance owning the attribute
+            name (str): the attribute name
+            stage (str): the stage name
+        """
+        if not isinstance(owner, type):
+            setattr(owner, name, self.timed(stage, getattr(owner, name)))
+            return
+        attr = getattr_static(owner, name)
+        if isinstance(attr, classmethod):
+            attr = classmethod(self.timed(stage, attr.__func__))
+        elif isinstance(attr, staticmethod):
+            attr = staticmethod(self.timed(stage, attr.__func__))
+        elif isinstance(attr, property):
+            attr = attr.setter(self.timed(stage, attr.fset))
+        else:
+            attr = self.timed(stage, attr)
+        setattr(owner, name, attr)
+
+    def instrument_app(self, app, auth):
+        """ Install the timers on the API hot path
+        Args:
+            app: the Flask application, its views are timed
+            auth: the auth instance, its before_request steps are timed
+        """
+        from models.base import Base
+        from models.user import User
+
+        if auth is not None:
+            for name in ('require_auth', 'authorization_header',
+                         'session_cookie', 'current_user'):
+                self.instrument(auth, name, "auth.{}".format(name))
+        for name in ('get', 'search', 'save', 'remove',
+                     'save_to_file', 'load_from_file'):
+            self.instrument(Base, name, "store.{}".format(name))
+        self.instrument(User, 'password', "password.hash")
+        self.instrument(User, 'is_valid_password', "password.verify")
+        for endpoint, view in list(app.view_functions.items()):
+            if endpoint != 'static':
+                app.view_functions[endpoint] = self.timed(
+                    "view.{}".format(endpoint), view)
+
+    def to_json(self) -> dict:
+        """ Convert every histogram to a JSON dictionary
+        Returns:
+            dict: the histograms keyed by stage name
+        """
+        with self._lock:
+            return {stage: histogram.to_json()
+                    for stage, histogram in sorted(self.histograms.items())}
+
+
+metrics = Metrics(getenv("API_METRICS", "").lower() in ("1", "true", "yes"))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Module of the API startup: phase timings and model loading
+Every startup phase is timed; with STARTUP_PROFILE=1 the timings are
+printed once the app is created. With LOAD_MODELS=background the model
+files are loaded by a thread while the app already answers, requests
+needing the models wait for it (see /api/v1/ready).
+"""
+from contextlib import contextmanager
+from os import getenv
+from threading import Event, Thread
+import sys
+import time
+
+
+class Startup:
+    """
+    Timings of the startup phases and state of the model loading
+    """
+
+    def __init__(self):
+        """ Initialize, the startup begins now
+        """
+        self.started_at = time.perf_counter()
+        self.phases = {}
+        self.ready = Event()
+        self.ready_timeout = float(getenv('READY_TIMEOUT', '30'))
+        self.error = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """ Context manager timing a startup phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - start) * 1000,
+                                      1)
+
+    def load_models(self, *classes, background: bool = None):
+        """
+        Load the objects of the model classes from their files
+        Args:
+            classes: the model classes.
+            background: load from a thread, LOAD_MODELS=background by
+              default.
+        """
+        if background is None:
+            background = getenv('LOAD_MODELS') == 'background'
+
+        def load():
+            try:
+                with self.phase('load models'):
+                    for cls in classes:
+                        cls.load_from_file()
+            except Exception as e:
+                self.error = repr(e)
+                raise
+            finally:
+                self.ready.set()
+                if background:
+                    self._print('load models')
+
+        if background:
+            Thread(target=load, name='load-models', daemon=True).start()
+        else:
+            load()
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """
+        Wait for the models to be loaded
+        Args:
+            timeout: seconds to wait, READY_TIMEOUT or 30 by default.
+        Returns:
+            True if they are loaded without error.
+        """
+        if timeout is None:
+            timeout = self.ready_timeout
+        return self.ready.wait(timeout) and self.error is None
+
+    def report(self) -> dict:
+        """ Readiness and phase timings in milliseconds
+        """
+        return {
+            "ready": self.ready.is_set() and self.error is None,
+            "error": self.error,
+            "phases_ms": dict(self.phases),
+        }
+
+    def finish(self):
+        """ Record the total startup time and print the profile if
+        STARTUP_PROFILE is set
+        """
+        self.phases['total'] = round(
+            (time.perf_counter() - self.started_at) * 1000, 1)
+        for name in self.phases:
+            self._print(name)
+
+    def _print(self, name: str):
+        """ Print the timing of a phase if STARTUP_PROFILE is set
+        """
+        if getenv('STARTUP_PROFILE') and name in self.phases:
+            print("startup {:<16}{:>10.1f} ms".format(
+                name, self.phases[name]), file=sys.stderr)
+
+
+startup = Startup()
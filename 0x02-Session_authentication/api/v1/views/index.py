@@ -17,15 +17,51 @@ def status() -> str:
 @app_views.route('/stats/', strict_slashes=False)
 def stats() -> str:
     """ GET /api/v1/stats
+    Counters are maintained as objects are saved and removed
     Return:
       - the number of each objects
+      - the number of users created per day
+      - the number of sessions held by the session auth, if any
     """
-    from models.user import User
+    from models.base import STORE_LOCK
+    from models.stats import STATS
+    from api.v1.app import auth
     stats = {}
-    stats['users'] = User.count()
+    with STORE_LOCK.read():
+        stats['users'] = STATS.count('User')
+        stats['user_sessions'] = STATS.count('UserSession')
+        stats['users_created_per_day'] = STATS.per_day('User')
+    sessions = getattr(auth, 'user_id_by_session_id', None)
+    if sessions is not None:
+        stats['sessions'] = {
+            'auth_type': type(auth).__name__,
+            'active': len(sessions),
+        }
     return jsonify(stats)
 
 
+@app_views.route('/ready', methods=['GET'], strict_slashes=False)
+def ready() -> str:
+    """ GET /api/v1/ready
+    Return:
+      - 200 once the models are loaded, 503 before or if loading failed
+      - the startup phase timings
+    """
+    from api.v1.startup import startup
+    report = startup.report()
+    return jsonify(report), 200 if report["ready"] else 503
+
+
+@app_views.route('/metrics', methods=['GET'], strict_slashes=False)
+def metrics_endpoint() -> str:
+    """ GET /api/v1/metrics
+    Return:
+      - the per-stage timing histograms, empty unless API_METRICS is set
+    """
+    from api.v1.metrics import metrics
+    return jsonify({"enabled": metrics.enabled, "stages": metrics.to_json()})
+
+
 @app_views.route('/unauthorized', methods=['GET'], strict_slashes=False)
 def unauthorized_endpoint():
     """
@@ -6,8 +6,7 @@ Handles Session Authentication
 from flask import jsonify, request, abort
 from api.v1.views import app_views
 from models.user import User
-from os import getenv
-from api.v1.auth.session_auth import SessionAuth
+from api.v1.auth.rate_limiter import login_limiter
 
 
 @app_views.route('/auth_session/login', methods=['POST'], strict_slashes=False)
@@ -23,6 +22,10 @@ def login():
     if not password:
         return jsonify({"error": "password missing"}), 400
 
+    throttle_keys = (('email', email), ('ip', request.remote_addr))
+    if not login_limiter.allow(*throttle_keys):
+        return jsonify({"error": "too many attempts"}), 429
+
     users = User.search({'email': email})
     if not users:
         return jsonify({"error": "no user found for this email"}), 404
@@ -31,11 +34,14 @@ def login():
 
     if not user.is_valid_password(password):
         return jsonify({"error": "wrong password"}), 401
+    login_limiter.refund(*throttle_keys)
 
     from api.v1.app import auth
     new_session_id = auth.create_session(user.id)
+    if new_session_id is None:
+        return jsonify({"error": "can't create a session"}), 503
     response = jsonify(user.to_json())
-    response.set_cookie(getenv("SESSION_NAME"), new_session_id)
+    response.set_cookie(auth.session_name, new_session_id)
     return response
 
 
@@ -2,18 +2,156 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, abort, jsonify, make_response, request
 from models.user import User
+from threading import Lock
+import binascii
+import json
+import uuid
+
+
+MAX_PAGE_SIZE = 1000
+MAX_BULK_SIZE = 10000
+RENDER_CACHE_SIZE = 1024
+BOOT_ID = uuid.uuid4().hex[:8]
+_render_cache = OrderedDict()
+_render_lock = Lock()
+
+
+def _encode_cursor(user_id: str) -> str:
+    """ Opaque pagination cursor pointing after a User ID
+    """
+    return urlsafe_b64encode(user_id.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> str:
+    """ User ID of a pagination cursor, None if invalid
+    """
+    try:
+        user_id = urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not user_id or _encode_cursor(user_id) != cursor:
+        return None
+    return user_id
+
+
+def _select(user: User, fields: list) -> dict:
+    """ JSON representation of a User restricted to some fields
+    """
+    user_json = user.to_json()
+    if not fields:
+        return user_json
+    return {k: user_json.get(k) for k in fields}
+
+
+def _stream(users: list, fields: list):
+    """ Generator writing a JSON list of users incrementally
+    """
+    yield "["
+    for i, user in enumerate(users):
+        yield ("," if i else "") + json.dumps(_select(user, fields))
+    yield "]\n"
+
+
+def _cached_response(key: tuple, etag: str, render):
+    """ JSON response rendered once per ETag
+    Return:
+      - 304 if the client already has the ETag
+      - the cached body if it was rendered for the same ETag
+      - else the response of render(), cached if successful
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    with _render_lock:
+        cached = _render_cache.get(key)
+        if cached is not None:
+            _render_cache.move_to_end(key)
+    if cached is not None and cached[0] == etag:
+        response = Response(cached[1], mimetype='application/json',
+                            headers=cached[2])
+    else:
+        response = make_response(render())
+        if response.status_code != 200:
+            return response
+        headers = {}
+        if 'X-Next-Cursor' in response.headers:
+            headers['X-Next-Cursor'] = response.headers['X-Next-Cursor']
+        with _render_lock:
+            _render_cache[key] = (etag, response.get_data(), headers)
+            while len(_render_cache) > RENDER_CACHE_SIZE:
+                _render_cache.popitem(last=False)
+    response.set_etag(etag)
+    return response
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Supports conditional requests: the ETag changes with every change of
+    the User store and If-None-Match returns 304.
+    Query parameters (optional):
+      - limit: page size, users are then ordered by ID and the cursor
+        of the next page is returned in the X-Next-Cursor header
+      - after: cursor returned by the previous page
+      - fields: comma-separated list of fields to return
+      - stream: 1 to write the JSON list incrementally
     Return:
-      - list of all User objects JSON represented
+      - list of User objects JSON represented
+      - 400 if a query parameter is invalid
+    """
+    if request.args.get('stream') in ('1', 'true'):
+        return _users_response()
+    etag = "users-{}-{}".format(BOOT_ID, User.generation())
+    return _cached_response(('users', request.query_string), etag,
+                            _users_response)
+
+
+def _users_response():
+    """ Response of GET /api/v1/users, see view_all_users
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    fields = [f for f in request.args.get('fields', '').split(',') if f]
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    stream = request.args.get('stream') in ('1', 'true')
+
+    if limit is None and after is None:
+        users = User.all()
+        next_cursor = None
+    else:
+        if limit is None:
+            limit = str(MAX_PAGE_SIZE)
+        if not limit.isdigit() or not 0 < int(limit) <= MAX_PAGE_SIZE:
+            return jsonify({'error': "Wrong limit"}), 400
+        limit = int(limit)
+        after_id = None
+        if after is not None:
+            after_id = _decode_cursor(after)
+            if after_id is None:
+                return jsonify({'error': "Wrong cursor"}), 400
+        ids = User.sorted_ids()
+        start = 0 if after_id is None else bisect_right(ids, after_id)
+        page_ids = ids[start:start + limit]
+        users = [u for u in map(User.get, page_ids) if u is not None]
+        next_cursor = None
+        if start + limit < len(ids):
+            next_cursor = _encode_cursor(page_ids[-1])
+
+    if stream:
+        response = Response(_stream(users, fields),
+                            mimetype='application/json')
+    else:
+        response = jsonify([_select(user, fields) for user in users])
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -22,7 +160,8 @@ def view_one_user(user_id: str = None) -> str:
     Path parameter:
       - User ID
     Return:
-      - User object JSON represented
+      - User object JSON represented, with an ETag derived from
+        updated_at (304 if it matches If-None-Match)
       - 404 if the User ID doesn't exist
     """
     if user_id is None:
@@ -32,12 +171,14 @@ def view_one_user(user_id: str = None) -> str:
         abort(404)
 
     if user_id == 'me':
-        return jsonify(request.current_user.to_json())
-
-    user = User.get(user_id)
+        user = request.current_user
+    else:
+        user = User.get(user_id)
     if user is None:
         abort(404)
-    return jsonify(user.to_json())
+    etag = "{}-{}".format(user.id, user.updated_at.timestamp())
+    return _cached_response(('user', user.id), etag,
+                            lambda: jsonify(user.to_json()))
 
 
 @app_views.route('/users/<user_id>', methods=['DELETE'], strict_slashes=False)
@@ -127,3 +268,131 @@ def update_user(user_id: str = None) -> str:
         user.last_name = rj.get('last_name')
     user.save()
     return jsonify(user.to_json()), 200
+
+
+def _bulk_items() -> list:
+    """ JSON array body of a bulk request, None if invalid
+    """
+    try:
+        items = request.get_json()
+    except Exception as e:
+        items = None
+    if not isinstance(items, list) or len(items) > MAX_BULK_SIZE:
+        return None
+    return items
+
+
+def _set_password(user: User, password: str):
+    """ Hash and set the password of a User
+    """
+    user.password = password
+
+
+@app_views.route('/users/bulk', methods=['POST'], strict_slashes=False)
+def create_users() -> str:
+    """ POST /api/v1/users/bulk
+    JSON body:
+      - list of objects with the create_user fields
+    Return:
+      - list of per-item results: status 201 and the User object JSON
+        represented, or status 400 and the error
+      - 400 if the body is not a list of at most MAX_BULK_SIZE items
+    """
+    items = _bulk_items()
+    if items is None:
+        return jsonify({'error': "Wrong format"}), 400
+    results = []
+    users = []
+    passwords = []
+    for rj in items:
+        error_msg = None
+        if not isinstance(rj, dict):
+            error_msg = "Wrong format"
+        if error_msg is None and rj.get("email", "") == "":
+            error_msg = "email missing"
+        if error_msg is None and rj.get("password", "") == "":
+            error_msg = "password missing"
+        if error_msg is not None:
+            results.append({'status': 400, 'error': error_msg})
+            continue
+        user = User()
+        user.email = rj.get("email")
+        user.first_name = rj.get("first_name")
+        user.last_name = rj.get("last_name")
+        users.append(user)
+        passwords.append(rj.get("password"))
+        results.append({'status': 201, 'user': user})
+
+    try:
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(_set_password, users, passwords))
+        User.save_many(users)
+    except Exception as e:
+        return jsonify({'error': "Can't create Users: {}".format(e)}), 400
+    for result in results:
+        if 'user' in result:
+            result['user'] = result['user'].to_json()
+    return jsonify(results), 200
+
+
+@app_views.route('/users/bulk', methods=['PATCH'], strict_slashes=False)
+def update_users() -> str:
+    """ PATCH /api/v1/users/bulk
+    JSON body:
+      - list of objects with the User ID and the update_user fields
+    Return:
+      - list of per-item results: status 200 and the User object JSON
+        represented, 404 if the User ID doesn't exist or 400
+      - 400 if the body is not a list of at most MAX_BULK_SIZE items
+    """
+    items = _bulk_items()
+    if items is None:
+        return jsonify({'error': "Wrong format"}), 400
+    results = []
+    users = []
+    for rj in items:
+        if not isinstance(rj, dict):
+            results.append({'status': 400, 'error': "Wrong format"})
+            continue
+        user_id = rj.get('id')
+        user = User.get(user_id) if isinstance(user_id, str) else None
+        if user is None:
+            results.append({'status': 404, 'error': "Not found"})
+            continue
+        if rj.get('first_name') is not None:
+            user.first_name = rj.get('first_name')
+        if rj.get('last_name') is not None:
+            user.last_name = rj.get('last_name')
+        users.append(user)
+        results.append({'status': 200, 'user': user})
+    User.save_many(users)
+    for result in results:
+        if 'user' in result:
+            result['user'] = result['user'].to_json()
+    return jsonify(results), 200
+
+
+@app_views.route('/users/bulk', methods=['DELETE'], strict_slashes=False)
+def delete_users() -> str:
+    """ DELETE /api/v1/users/bulk
+    JSON body:
+      - list of User IDs
+    Return:
+      - list of per-item results: status 200 if the User has been
+        deleted, 404 if the User ID doesn't exist
+      - 400 if the body is not a list of at most MAX_BULK_SIZE items
+    """
+    items = _bulk_items()
+    if items is None:
+        return jsonify({'error': "Wrong format"}), 400
+    results = []
+    users = {}
+    for user_id in items:
+        user = User.get(user_id) if isinstance(user_id, str) else None
+        if user is None or user_id in users:
+            results.append({'status': 404, 'error': "Not found"})
+            continue
+        users[user_id] = user
+        results.append({'status': 200})
+    User.remove_many(users.values())
+    return jsonify(results), 200
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+""" Benchmark of the auth backends of the API
+Seeds N users and N sessions through models.base, then for every
+AUTH_TYPE measures:
+  - the cost of an authenticated request (before_request + current_user)
+  - the cost of a login/logout round trip (session backends)
+  - the memory held by the seeded sessions
+the hash/verify cost of every password hasher, and multi-threaded
+session create/lookup on a plain dict against the sharded session map.
+Results are written as JSON, e.g.:
+    ./benchmark.py --scales 10000,100000 --output benchmark.json
+The store files are written in a temporary directory.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from api.v1.auth import AUTH_BACKENDS, auth_class
+
+EMAIL = "bench@hbtn.io"
+PASSWORD = "H0lbertonSchool98!"
+
+
+def seed_users(n: int):
+    """ Seed n users sharing one password hash, return the bench user
+    """
+    from models.base import DATA
+    from models.user import User
+
+    DATA['User'] = {}
+    user = User(email=EMAIL)
+    user.password = PASSWORD
+    for i in range(n - 1):
+        other = User(email="user{}@hbtn.io".format(i),
+                     _password=user.password)
+        DATA['User'][other.id] = other
+    User.save_many([user])
+    return user
+
+
+def seed_sessions(auth, n: int):
+    """ Seed n - 1 sessions of other users in the backend store
+    """
+    from models.base import DATA
+    from models.user_session import UserSession
+    from api.v1.auth.session_auth import SessionAuth
+
+    SessionAuth.user_id_by_session_id.clear()
+    DATA['UserSession'] = {}
+    if type(auth).__name__ == 'SessionDBAuth':
+        UserSession.save_many(
+            UserSession(user_id=str(uuid.uuid4()),
+                        session_id=str(uuid.uuid4()))
+            for _ in range(n - 1))
+    elif hasattr(auth, 'user_id_by_session_id'):
+        for _ in range(n - 1):
+            auth.create_session(str(uuid.uuid4()))
+
+
+def credentials(auth, client, user) -> dict:
+    """ Log the bench user in, return the request headers to send
+    """
+    if type(auth).__name__ == 'BasicAuth':
+        token = base64.b64encode("{}:{}".format(EMAIL, PASSWORD).encode())
+        return {'Authorization': 'Basic ' + token.decode()}
+    client.post('/api/v1/auth_session/login',
+                data={'email': EMAIL, 'password': PASSWORD})
+    return {}
+
+
+def per_call(func, count: int) -> float:
+    """ Mean duration of func in microseconds over count calls
+    """
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return round((time.perf_counter() - start) / count * 1000000, 1)
+
+
+def bench_backend(auth_type: str, scale: int, requests: int,
+                  logins: int) -> dict:
+    """ Benchmark one backend at one scale
+    """
+    import api.v1.app as api
+
+    auth = auth_class(auth_type)()
+    api.auth = auth
+    user = seed_users(scale)
+
+    tracemalloc.start()
+    seed_sessions(auth, scale)
+    sessions_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    client = api.app.test_client()
+    headers = credentials(auth, client, user)
+    response = client.get('/api/v1/users/me', headers=headers)
+    result = {
+        'auth_type': auth_type,
+        'scale': scale,
+        'me_status': response.status_code,
+        'request_us': per_call(
+            lambda: client.get('/api/v1/users/me', headers=headers),
+            requests),
+        'sessions_mb': round(sessions_bytes / 1e6, 2),
+    }
+    with api.app.test_request_context('/api/v1/users/me', headers=headers,
+                                      environ_base=cookie_environ(client)):
+        from flask import request
+        result['current_user_us'] = per_call(
+            lambda: (request.__dict__.pop('_auth_context', None),
+                     auth.current_user(request)), requests)
+
+    if hasattr(auth, 'create_session'):
+        def login_logout():
+            client.post('/api/v1/auth_session/login',
+                        data={'email': EMAIL, 'password': PASSWORD})
+            client.delete('/api/v1/auth_session/logout')
+        result['login_logout_us'] = per_call(login_logout, logins)
+    return result
+
+
+def bench_hashers(count: int) -> list:
+    """ Benchmark every password hasher
+    """
+    from models.hashers import HASHERS, VERIFY_CACHE, check_password
+
+    results = []
+    for scheme, hasher in HASHERS.items():
+        encoded = hasher.encode(PASSWORD)
+        VERIFY_CACHE.max_size, max_size = 0, VERIFY_CACHE.max_size
+        verify_us = per_call(lambda: check_password(PASSWORD, encoded),
+                             count)
+        VERIFY_CACHE.max_size = max_size
+        check_password(PASSWORD, encoded)
+        results.append({
+            'scheme': scheme,
+            'encode_us': per_call(lambda: hasher.encode(PASSWORD), count),
+            'verify_us': verify_us,
+            'cached_verify_us': per_call(
+                lambda: check_password(PASSWORD, encoded), count * 100),
+        })
+    return results
+
+
+def bench_session_maps(ops: int, threads_list: list) -> list:
+    """ Benchmark threads creating and looking up sessions
+    Every thread creates ops sessions, then looks each up 4 times.
+    The plain dict is the former SessionAuth store, written without
+    lock, and the worst single create measures the dict resize spikes
+    """
+    import threading
+    from api.v1.auth.session_map import ShardedSessionMap
+
+    results = []
+    for threads in threads_list:
+        for name in ('dict', 'sharded'):
+            store = {} if name == 'dict' else ShardedSessionMap()
+            new_id = getattr(store, 'new_session_id',
+                             lambda: str(uuid.uuid4()))
+            worst = [0.0]
+
+            def worker():
+                ids = []
+                slowest = 0.0
+                for _ in range(ops):
+                    start = time.perf_counter()
+                    session_id = new_id()
+                    store[session_id] = "user"
+                    slowest = max(slowest, time.perf_counter() - start)
+                    ids.append(session_id)
+                for _ in range(4):
+                    for session_id in ids:
+                        store.get(session_id)
+                worst[0] = max(worst[0], slowest)
+
+            workers = [threading.Thread(target=worker)
+                       for _ in range(threads)]
+            start = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            results.append({
+                'session_map': name,
+                'threads': threads,
+                'sessions': len(store),
+                'ops_per_s': round(threads * ops * 5 / elapsed),
+                'worst_create_us': round(worst[0] * 1000000, 1),
+            })
+    return results
+
+
+def cookie_environ(client) -> dict:
+    """ WSGI environ carrying the cookies of a test client
+    """
+    cookie = client.get_cookie(os.environ['SESSION_NAME'])
+    if cookie is None:
+        return {}
+    return {'HTTP_COOKIE': '{}={}'.format(cookie.key, cookie.value)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auth backends benchmark")
+    parser.add_argument('--scales', default='10000',
+                        help="comma-separated user/session counts, "
+                        "e.g. 10000,100000,1000000")
+    parser.add_argument('--auth-types', default=','.join(
+        t for t in AUTH_BACKENDS if t != 'auth'))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--hashes', type=int, default=5,
+                        help="hash/verify calls per hasher")
+    parser.add_argument('--session-ops', type=int, default=100000,
+                        help="sessions created per thread")
+    parser.add_argument('--threads', default='1,2,4,8')
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    os.environ.setdefault('SESSION_NAME', '_my_session_id')
+    os.environ.setdefault('SESSION_DURATION', '3600')
+    os.chdir(tempfile.mkdtemp(prefix='auth-bench-'))
+
+    results = []
+    for scale in [int(s) for s in args.scales.split(',')]:
+        for auth_type in args.auth_types.split(','):
+            result = bench_backend(auth_type, scale, args.requests,
+                                   args.logins)
+            print(json.dumps(result))
+            results.append(result)
+    hashers = bench_hashers(args.hashes)
+    for result in hashers:
+        print(json.dumps(result))
+    session_maps = bench_session_maps(
+        args.session_ops, [int(t) for t in args.threads.split(',')])
+    for result in session_maps:
+        print(json.dumps(result))
+
+    with open(output, 'w') as f:
+        json.dump({
+            'date': datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'results': results,
+            'hashers': hashers,
+            'session_maps': session_maps,
+        }, f, indent=2)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+""" Example consumer of the change feed
+Keeps an email -> user_id index in sync with the User changes, either
+in process:
+    index = EmailIndex()
+    CHANGES.subscribe(index.apply)
+or from another process, by tailing the log written with CHANGE_LOG:
+    ./email_index.py .db_changes.log [--after SEQ]
+"""
+import argparse
+
+from models.changes import read_changes
+
+
+class EmailIndex():
+    """ Index of user IDs by email, updated from change events
+    """
+
+    def __init__(self):
+        """ Initialize an empty index
+        """
+        self.user_ids = {}
+        self.emails = {}
+        self.seq = 0
+
+    def apply(self, event: dict):
+        """ Update the index with a change event
+        """
+        self.seq = event['seq']
+        if event['class'] != 'User':
+            return
+        user_id = event['id']
+        email = self.emails.pop(user_id, None)
+        if email is not None and self.user_ids.get(email) == user_id:
+            del self.user_ids[email]
+        email = event['object'].get('email')
+        if event['op'] == 'save' and email is not None:
+            self.emails[user_id] = email
+            self.user_ids[email] = user_id
+
+    def get(self, email: str) -> str:
+        """ ID of the user with this email, None if unknown
+        """
+        return self.user_ids.get(email)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="email -> user_id index")
+    parser.add_argument('log')
+    parser.add_argument('--after', type=int, default=0,
+                        help="resume after this sequence number")
+    args = parser.parse_args()
+
+    index = EmailIndex()
+    for event in read_changes(args.log, args.after, follow=True):
+        index.apply(event)
+        print("seq {}: {} {} {} ({} emails)".format(
+            index.seq, event['op'], event['class'],
+            event['object'].get('email', event['id']),
+            len(index.user_ids)))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+""" Load test of the WSGI and ASGI entry points of the API
+N concurrent clients send a mix of profile reads and logins to
+api.v1.app:app, driven by N threads as a threaded WSGI server would,
+then to api.v1.asgi:application, driven by N tasks of one event loop as
+an ASGI server would. Throughput and p50/p95/p99 latencies are
+reported for each:
+    ./loadtest.py --concurrency 1,8,32 --requests 50 --mix me=9,login=1
+The store files are written in a temporary directory.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+EMAIL = "load@hbtn.io"
+PASSWORD = "H0lbertonSchool98!"
+REQUESTS = {
+    'me': ('GET', '/api/v1/users/me', None),
+    'login': ('POST', '/api/v1/auth_session/login',
+              {'email': EMAIL, 'password': PASSWORD}),
+}
+
+
+def setup() -> str:
+    """ Create the load test user, return a session cookie header
+    """
+    from api.v1.app import app
+    from models.user import User
+
+    user = User(email=EMAIL)
+    user.password = PASSWORD
+    User.save_many([user])
+    client = app.test_client()
+    client.post('/api/v1/auth_session/login',
+                data={'email': EMAIL, 'password': PASSWORD})
+    cookie = client.get_cookie(os.environ['SESSION_NAME'])
+    return '{}={}'.format(cookie.key, cookie.value)
+
+
+def requests_of(mix: dict, count: int, seed: int) -> list:
+    """ count (method, path, body) requests drawn from the mix
+    """
+    names = [name for name, weight in mix.items() for _ in range(weight)]
+    rand = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        method, path, form = REQUESTS[rand.choice(names)]
+        requests.append((method, path,
+                         urlencode(form).encode() if form else b''))
+    return requests
+
+
+def headers_of(cookie: str, body: bytes) -> dict:
+    """ Headers of a request
+    """
+    headers = {'Cookie': cookie}
+    if body:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        headers['Content-Length'] = str(len(body))
+    return headers
+
+
+def run_wsgi(workload: list, cookie: str) -> list:
+    """ Send the requests of every client from its own thread, return
+    the (status, seconds) samples
+    """
+    from api.v1.app import app
+
+    samples = []
+
+    def client(requests: list):
+        test_client = app.test_client(use_cookies=False)
+        for method, path, body in requests:
+            start = time.perf_counter()
+            response = test_client.open(path, method=method, data=body,
+                                        headers=headers_of(cookie, body))
+            samples.append((response.status_code,
+                            time.perf_counter() - start))
+
+    threads = [threading.Thread(target=client, args=(requests,))
+               for requests in workload]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+async def asgi_request(application, method: str, path: str, body: bytes,
+                       headers: dict) -> int:
+    """ Send one HTTP request to an ASGI application, return the status
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(name.lower().encode(), value.encode())
+                    for name, value in headers.items()],
+        'client': ('127.0.0.1', 50000),
+        'server': ('127.0.0.1', 5000),
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(workload: list, cookie: str) -> list:
+    """ Send the requests of every client from its own task of one
+    event loop, return the (status, seconds) samples
+    """
+    from api.v1.asgi import application
+
+    samples = []
+
+    async def client(requests: list):
+        for method, path, body in requests:
+            start = time.perf_counter()
+            status = await asgi_request(application, method, path, body,
+                                        headers_of(cookie, body))
+            samples.append((status, time.perf_counter() - start))
+
+    async def main():
+        await asyncio.gather(*(client(requests) for requests in workload))
+
+    asyncio.run(main())
+    return samples
+
+
+def percentile(samples: list, percent: int) -> float:
+    """ Percentile of sorted durations in milliseconds
+    """
+    index = min(len(samples) - 1, int(len(samples) * percent / 100))
+    return round(samples[index] * 1000, 2)
+
+
+def report(server: str, concurrency: int, samples: list,
+           elapsed: float) -> dict:
+    """ Throughput and latencies of a run
+    """
+    durations = sorted(seconds for _, seconds in samples)
+    errors = {}
+    for status, _ in samples:
+        if status >= 400:
+            errors[status] = errors.get(status, 0) + 1
+    return {
+        'server': server,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 1),
+        'p50_ms': percentile(durations, 50),
+        'p95_ms': percentile(durations, 95),
+        'p99_ms': percentile(durations, 99),
+        'errors': errors,
+    }
+
+
+def parse_mix(mix: str) -> dict:
+    """ Parse "me=9,login=1" into request weights
+    """
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        if name not in REQUESTS:
+            raise ValueError("unknown request: {}".format(name))
+        weights[name] = int(weight or 1)
+    return weights
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="WSGI/ASGI load test of the API")
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help="comma-separated client counts")
+    parser.add_argument('--requests', type=int, default=50,
+                        help="requests per client")
+    parser.add_argument('--mix', default='me=9,login=1')
+    parser.add_argument('--output', help="also write the results as JSON")
+    args = parser.parse_args()
+
+    output = args.output and os.path.abspath(args.output)
+    os.environ.setdefault('AUTH_TYPE', 'session_auth')
+    os.environ.setdefault('SESSION_NAME', '_my_session_id')
+    os.environ.setdefault('LOGIN_RATE_LIMIT', '1000000')
+    os.chdir(tempfile.mkdtemp(prefix='auth-load-'))
+
+    cookie = setup()
+    mix = parse_mix(args.mix)
+    results = []
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        workload = [requests_of(mix, args.requests, n)
+                    for n in range(concurrency)]
+        for server, run in (('wsgi', run_wsgi), ('asgi', run_asgi)):
+            start = time.perf_counter()
+            samples = run(workload, cookie)
+            result = report(server, concurrency, samples,
+                            time.perf_counter() - start)
+            print(json.dumps(result))
+            results.append(result)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
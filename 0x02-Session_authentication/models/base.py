@@ -3,13 +3,21 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
+from os import path, replace
+from models.changes import CHANGES
+from models.locks import GroupCommit, RWLock
+from models.snapshot import Snapshot, write_snapshot
+from models.stats import STATS
 import json
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
 DATA = {}
+SORTED_IDS = {}
+GENERATIONS = {}
+FILE_WRITERS = {}
+STORE_LOCK = RWLock()
 
 
 class Base():
@@ -60,47 +68,152 @@ class Base():
     @classmethod
     def load_from_file(cls):
         """ Load all objects from file
+        A snapshot at least as recent as the JSON file is opened
+        instead, its objects are decoded on access
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
+        snapshot_path = ".db_{}.snap".format(s_class)
+        if path.exists(snapshot_path) and (
+                not path.exists(file_path) or
+                path.getmtime(snapshot_path) >= path.getmtime(file_path)):
+            objs = Snapshot(cls, snapshot_path)
+            with STORE_LOCK:
+                DATA[s_class] = objs
+                STATS.load(s_class, objs.created_per_day())
+                cls._changed(True)
             return
+        objs = {}
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+                for obj_id, obj_json in objs_json.items():
+                    objs[obj_id] = cls(**obj_json)
+        with STORE_LOCK:
+            DATA[s_class] = objs
+            STATS.reset(s_class, objs.values())
+            cls._changed(True)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def _changed(cls, reindex: bool = False):
+        """ Record a change of the stored objects
+        Bumps the generation and, if objects were added or removed,
+        drops the sorted IDs cache
+        """
+        s_class = cls.__name__
+        GENERATIONS[s_class] = GENERATIONS.get(s_class, 0) + 1
+        if reindex:
+            SORTED_IDS.pop(s_class, None)
+
+    @classmethod
+    def generation(cls) -> int:
+        """ Return a counter increased by every change of the objects
+        """
+        return GENERATIONS.get(cls.__name__, 0)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
+        Writes are serialized and coalesced: the call returns once a
+        write started after it is done
+        """
+        s_class = cls.__name__
+        writer = FILE_WRITERS.get(s_class)
+        if writer is None:
+            writer = FILE_WRITERS.setdefault(s_class,
+                                             GroupCommit(cls._write_file))
+        writer()
+
+    @classmethod
+    def _write_file(cls):
+        """ Write all objects to file, replacing it atomically
         """
         s_class = cls.__name__
         file_path = ".db_{}.json".format(s_class)
+        with STORE_LOCK.read():
+            objs = list(DATA[s_class].values())
         objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        for obj in objs:
+            objs_json[obj.id] = obj.to_json(True)
 
-        with open(file_path, 'w') as f:
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, 'w') as f:
             json.dump(objs_json, f)
+        replace(tmp_path, file_path)
+
+    @classmethod
+    def save_snapshot(cls):
+        """ Save all objects to a snapshot file
+        """
+        s_class = cls.__name__
+        with STORE_LOCK.read():
+            objs = list(DATA[s_class].values())
+        write_snapshot(".db_{}.snap".format(s_class), objs)
 
     def save(self):
         """ Save current object
         """
         s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
+        with STORE_LOCK:
+            previous = DATA[s_class].get(self.id)
+            DATA[s_class][self.id] = self
+            if previous is not None:
+                STATS.removed(s_class, previous)
+            STATS.added(s_class, self)
+            self.__class__._changed(previous is None)
+            CHANGES.publish('save', [self])
         self.__class__.save_to_file()
 
     def remove(self):
         """ Remove object
         """
         s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
+        with STORE_LOCK:
+            previous = DATA[s_class].pop(self.id, None)
+            if previous is not None:
+                STATS.removed(s_class, previous)
+                self.__class__._changed(True)
+                CHANGES.publish('remove', [previous])
+        if previous is not None:
             self.__class__.save_to_file()
 
+    @classmethod
+    def save_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Save several objects, the file is written once
+        """
+        s_class = cls.__name__
+        now = datetime.utcnow()
+        saved = []
+        with STORE_LOCK:
+            for obj in objs:
+                obj.updated_at = now
+                previous = DATA[s_class].get(obj.id)
+                DATA[s_class][obj.id] = obj
+                if previous is not None:
+                    STATS.removed(s_class, previous)
+                STATS.added(s_class, obj)
+                cls._changed(previous is None)
+                saved.append(obj)
+            CHANGES.publish('save', saved)
+        cls.save_to_file()
+
+    @classmethod
+    def remove_many(cls, objs: Iterable[TypeVar('Base')]):
+        """ Remove several objects, the file is written once
+        """
+        s_class = cls.__name__
+        removed = []
+        with STORE_LOCK:
+            for obj in objs:
+                previous = DATA[s_class].pop(obj.id, None)
+                if previous is not None:
+                    STATS.removed(s_class, previous)
+                    cls._changed(True)
+                    removed.append(previous)
+            CHANGES.publish('remove', removed)
+        cls.save_to_file()
+
     @classmethod
     def count(cls) -> int:
         """ Count all objects
@@ -114,6 +227,18 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def sorted_ids(cls) -> List[str]:
+        """ Return all object IDs in ascending order
+        The list is cached until an object is added or removed
+        """
+        s_class = cls.__name__
+        ids = SORTED_IDS.get(s_class)
+        if ids is None:
+            with STORE_LOCK.read():
+                ids = SORTED_IDS[s_class] = sorted(DATA[s_class])
+        return ids
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
@@ -126,6 +251,7 @@ class Base():
         """ Search all objects with matching attributes
         """
         s_class = cls.__name__
+
         def _search(obj):
             if len(attributes) == 0:
                 return True
@@ -133,5 +259,11 @@ class Base():
                 if (getattr(obj, k) != v):
                     return False
             return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+
+        with STORE_LOCK.read():
+            objs = DATA[s_class]
+            find = getattr(objs, 'find', None)
+            candidates = find(attributes) if find is not None else None
+            if candidates is None:
+                candidates = objs.values()
+            return list(filter(_search, candidates))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+""" Changes module
+Feed of the objects saved and removed through models.base. Every
+change gets a sequence number and is published to the in-process
+subscribers and, when CHANGE_LOG is set, appended to that JSON lines
+log so that other processes can tail it and resume from a sequence
+number. A single process should write to a given log.
+
+An event is a dict:
+    {"seq": 42, "op": "save" | "remove", "class": "User",
+     "id": "...", "object": {... the object JSON ...}}
+The object JSON is to_json() without its private "_" fields, so
+password hashes never reach the log or the subscribers.
+"""
+from os import getenv, path
+from typing import Callable, Iterable, Iterator, TypeVar
+import json
+import logging
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed():
+    """ Sequence numbered feed of object changes
+    """
+
+    def __init__(self, log_path: str = None):
+        """ Initialize the feed, resuming the sequence of the log
+        """
+        self.log_path = log_path
+        self.seq = 0
+        self._subscribers = []
+        self._log = None
+        if log_path:
+            drop_torn_tail(log_path)
+            self.seq = last_seq(log_path)
+            self._log = open(log_path, 'a')
+
+    def subscribe(self, callback: Callable[[dict], None]) -> Callable:
+        """ Call callback with every new event, return the function
+        removing the subscription
+        Callbacks run in the thread saving the objects, while it holds
+        models.base.STORE_LOCK, so they should be quick. Their errors
+        are logged and don't fail the save
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def publish(self, op: str, objs: Iterable[TypeVar('Base')]):
+        """ Publish the save or removal of objects
+        Called by models.base with STORE_LOCK held
+        """
+        objs = list(objs)
+        if not self._subscribers and self._log is None:
+            self.seq += len(objs)
+            return
+        events = []
+        for obj in objs:
+            self.seq += 1
+            events.append({
+                'seq': self.seq,
+                'op': op,
+                'class': obj.__class__.__name__,
+                'id': obj.id,
+                'object': obj.to_json(),
+            })
+        if self._log is not None:
+            self._log.write(''.join(json.dumps(event) + '\n'
+                                    for event in events))
+            self._log.flush()
+        for callback in list(self._subscribers):
+            try:
+                for event in events:
+                    callback(event)
+            except Exception:
+                logger.exception("change subscriber %r failed", callback)
+
+
+def _tail(f, lines: int) -> bytes:
+    """ End of an open binary file holding at least lines newlines,
+    or the whole file
+    """
+    f.seek(0, 2)
+    end = f.tell()
+    block = b''
+    while end > 0 and block.count(b'\n') < lines:
+        start = max(0, end - 4096)
+        f.seek(start)
+        block = f.read(end - start) + block
+        end = start
+    return block
+
+
+def drop_torn_tail(log_path: str):
+    """ Truncate the unterminated last line a crash left in a log
+    """
+    if not path.exists(log_path):
+        return
+    with open(log_path, 'rb+') as f:
+        block = _tail(f, 1)
+        torn = len(block) - block.rfind(b'\n') - 1
+        if torn:
+            f.seek(-torn, 2)
+            f.truncate()
+
+
+def last_seq(log_path: str) -> int:
+    """ Sequence number of the last complete event of a log, 0 if none
+    """
+    if not path.exists(log_path):
+        return 0
+    with open(log_path, 'rb') as f:
+        block = _tail(f, 2)
+    # the last item is an unterminated line, or empty
+    for line in reversed(block.split(b'\n')[:-1]):
+        if line.strip():
+            return json.loads(line)['seq']
+    return 0
+
+
+def read_changes(log_path: str, after: int = 0,
+                 follow: bool = False,
+                 poll_interval: float = 0.5) -> Iterator[dict]:
+    """ Events of a log with a sequence number greater than after
+    With follow, wait for new events instead of stopping at the end
+    """
+    while follow and not path.exists(log_path):
+        time.sleep(poll_interval)
+    with open(log_path) as f:
+        line = ''
+        while True:
+            line += f.readline()
+            if not line.endswith('\n'):
+                if not follow:
+                    return
+                time.sleep(poll_interval)
+                continue
+            event = json.loads(line)
+            line = ''
+            if event['seq'] > after:
+                yield event
+
+
+CHANGES = ChangeFeed(getenv('CHANGE_LOG'))
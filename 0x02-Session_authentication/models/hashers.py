@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+""" Password hashers module
+Encoded passwords are prefixed with their scheme:
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    bcrypt$<bcrypt hash>
+    argon2$<argon2 hash>
+A bare 64 hex digits value is a legacy unsalted SHA-256 hash.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from os import getenv
+from threading import Lock
+import base64
+import hashlib
+import hmac
+import os
+
+try:
+    import bcrypt
+except ImportError:
+    bcrypt = None
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+
+def _b64(raw: bytes) -> str:
+    """ Base64 without padding
+    """
+    return base64.b64encode(raw).decode().rstrip('=')
+
+
+def _unb64(text: str) -> bytes:
+    """ Decode a base64 value without padding
+    """
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+class Hasher(ABC):
+    """ Base class of the password hashers
+    Hashes of a scheme of lower strength are upgraded to the default
+    scheme, never the other way around
+    """
+    scheme = None
+    strength = 0
+
+    @abstractmethod
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+
+    @abstractmethod
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+
+    def needs_upgrade(self, encoded: str) -> bool:
+        """ True if the hash was made with weaker parameters
+        """
+        return False
+
+
+class SHA256Hasher(Hasher):
+    """ Legacy unsalted SHA-256, only kept to verify old hashes
+    """
+    scheme = 'sha256'
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        return hashlib.sha256(pwd.encode()).hexdigest().lower()
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        return hmac.compare_digest(self.encode(pwd), encoded.lower())
+
+
+class PBKDF2Hasher(Hasher):
+    """ PBKDF2-HMAC-SHA256 with a random salt
+    """
+    scheme = 'pbkdf2_sha256'
+    strength = 1
+
+    def __init__(self, iterations: int = None):
+        """ Initialize the hasher, PBKDF2_ITERATIONS or 260000
+        """
+        if iterations is None:
+            iterations = int(getenv('PBKDF2_ITERATIONS', '260000'))
+        self.iterations = iterations
+
+    def _hash(self, pwd: str, salt: bytes, iterations: int) -> bytes:
+        """ Derive the hash of a password
+        """
+        return hashlib.pbkdf2_hmac('sha256', pwd.encode(), salt, iterations)
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        salt = os.urandom(16)
+        return "{}${}${}${}".format(
+            self.scheme, self.iterations, _b64(salt),
+            _b64(self._hash(pwd, salt, self.iterations)))
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        _, iterations, salt, digest = encoded.split('$')
+        return hmac.compare_digest(
+            self._hash(pwd, _unb64(salt), int(iterations)), _unb64(digest))
+
+    def needs_upgrade(self, encoded: str) -> bool:
+        """ True if the hash was made with fewer iterations
+        """
+        return int(encoded.split('$')[1]) < self.iterations
+
+
+class ScryptHasher(Hasher):
+    """ scrypt with a random salt
+    """
+    scheme = 'scrypt'
+    strength = 2
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1):
+        """ Initialize the hasher with its cost parameters
+        """
+        self.n = n
+        self.r = r
+        self.p = p
+
+    def _hash(self, pwd: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        """ Derive the hash of a password
+        """
+        return hashlib.scrypt(pwd.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        salt = os.urandom(16)
+        return "{}${}${}${}${}${}".format(
+            self.scheme, self.n, self.r, self.p, _b64(salt),
+            _b64(self._hash(pwd, salt, self.n, self.r, self.p)))
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        _, n, r, p, salt, digest = encoded.split('$')
+        return hmac.compare_digest(
+            self._hash(pwd, _unb64(salt), int(n), int(r), int(p)),
+            _unb64(digest))
+
+    def needs_upgrade(self, encoded: str) -> bool:
+        """ True if the hash was made with a lower cost
+        """
+        _, n, r, p = encoded.split('$')[:4]
+        return (int(n), int(r), int(p)) < (self.n, self.r, self.p)
+
+
+class BcryptHasher(Hasher):
+    """ bcrypt, needs the bcrypt package
+    """
+    scheme = 'bcrypt'
+    strength = 2
+
+    def __init__(self, rounds: int = 12):
+        """ Initialize the hasher with its cost
+        """
+        self.rounds = rounds
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        hashed = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt(self.rounds))
+        return "{}${}".format(self.scheme, hashed.decode())
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        return bcrypt.checkpw(pwd.encode(),
+                              encoded.split('$', 1)[1].encode())
+
+    def needs_upgrade(self, encoded: str) -> bool:
+        """ True if the hash was made with fewer rounds
+        """
+        return int(encoded.split('$')[3]) < self.rounds
+
+
+class Argon2Hasher(Hasher):
+    """ argon2id, needs the argon2-cffi package
+    """
+    scheme = 'argon2'
+    strength = 3
+
+    def __init__(self):
+        """ Initialize the hasher with the argon2-cffi defaults
+        """
+        self.hasher = argon2.PasswordHasher()
+
+    def encode(self, pwd: str) -> str:
+        """ Hash a password
+        """
+        return "{}${}".format(self.scheme, self.hasher.hash(pwd))
+
+    def verify(self, pwd: str, encoded: str) -> bool:
+        """ Check a password against an encoded hash
+        """
+        try:
+            return self.hasher.verify(encoded.split('$', 1)[1], pwd)
+        except argon2.exceptions.VerificationError:
+            return False
+
+    def needs_upgrade(self, encoded: str) -> bool:
+        """ True if the hash was made with other parameters
+        """
+        return self.hasher.check_needs_rehash(encoded.split('$', 1)[1])
+
+
+HASHERS = {hasher.scheme: hasher for hasher in (
+    SHA256Hasher(), PBKDF2Hasher(), ScryptHasher(),
+    BcryptHasher() if bcrypt is not None else None,
+    Argon2Hasher() if argon2 is not None else None,
+) if hasher is not None}
+
+
+def _default_hasher(scheme: str) -> Hasher:
+    """ Hasher of a PASSWORD_HASHER setting
+    """
+    hasher = HASHERS.get(scheme)
+    if hasher is None or hasher.strength == 0:
+        raise ValueError("PASSWORD_HASHER must be one of: {}".format(
+            ', '.join(name for name, hasher in HASHERS.items()
+                      if hasher.strength > 0)))
+    return hasher
+
+
+DEFAULT_HASHER = _default_hasher(getenv('PASSWORD_HASHER', 'pbkdf2_sha256'))
+
+
+def default_hasher() -> Hasher:
+    """ Hasher of new passwords, PASSWORD_HASHER or pbkdf2_sha256
+    """
+    return DEFAULT_HASHER
+
+
+def hasher_of(encoded: str) -> Hasher:
+    """ Hasher of an encoded password, None if the scheme is unknown
+    """
+    scheme, sep, _ = encoded.partition('$')
+    if not sep:
+        scheme = SHA256Hasher.scheme
+    return HASHERS.get(scheme)
+
+
+class VerifyCache():
+    """ Bounded LRU cache of successful password checks
+    Keys are an HMAC of the password with a per-process secret and the
+    encoded hash, so a changed password never matches an old entry and
+    no plain password is kept in memory.
+    """
+
+    def __init__(self, max_size: int = None):
+        """ Initialize the cache, VERIFY_CACHE_SIZE or 1024 entries
+        """
+        if max_size is None:
+            max_size = int(getenv('VERIFY_CACHE_SIZE', '1024'))
+        self.max_size = max_size
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def _key(self, pwd: str, encoded: str) -> bytes:
+        """ Cache key of a password and its hash
+        """
+        return hmac.new(self._secret, "{}\0{}".format(encoded, pwd).encode(),
+                        hashlib.sha256).digest()
+
+    def contains(self, pwd: str, encoded: str) -> bool:
+        """ True if the password was verified against the hash
+        """
+        key = self._key(pwd, encoded)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, pwd: str, encoded: str):
+        """ Remember a successful check
+        """
+        if self.max_size <= 0:
+            return
+        key = self._key(pwd, encoded)
+        with self._lock:
+            self._entries[key] = True
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+VERIFY_CACHE = VerifyCache()
+
+
+def check_password(pwd: str, encoded: str) -> bool:
+    """ Check a password against an encoded hash of any known scheme
+    """
+    if VERIFY_CACHE.contains(pwd, encoded):
+        return True
+    hasher = hasher_of(encoded)
+    if hasher is None:
+        return False
+    try:
+        if not hasher.verify(pwd, encoded):
+            return False
+    except (ValueError, IndexError):
+        return False
+    VERIFY_CACHE.add(pwd, encoded)
+    return True
+
+
+def needs_upgrade(encoded: str) -> bool:
+    """ True if an encoded password should be hashed again: its scheme
+    is weaker than the default one, or it is the default scheme with
+    weaker parameters
+    """
+    hasher = hasher_of(encoded)
+    if hasher is None:
+        return False
+    if hasher is DEFAULT_HASHER:
+        return hasher.needs_upgrade(encoded)
+    return hasher.strength < DEFAULT_HASHER.strength
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+""" Locks module
+"""
+from contextlib import contextmanager
+from threading import Condition, Lock, get_ident, local
+from typing import Callable
+
+
+class RWLock():
+    """ Reentrant readers-writer lock
+    Used as a context manager it is taken for writing, like an RLock;
+    read() takes it for reading. Readers run together, a writer runs
+    alone, and waiting writers go before new readers. A thread holding
+    the lock for writing may also read; a reader must not ask to write.
+    """
+
+    def __init__(self):
+        """ Initialize an unlocked lock
+        """
+        self._cond = Condition(Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = local()
+
+    def acquire_read(self):
+        """ Take the lock for reading
+        """
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        if depth:
+            return
+        self._local.counted = self._writer != get_ident()
+        if not self._local.counted:
+            return
+        with self._cond:
+            while self._writer is not None or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """ Release the lock taken for reading
+        """
+        self._local.depth -= 1
+        if self._local.depth or not self._local.counted:
+            return
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire(self):
+        """ Take the lock for writing
+        """
+        me = get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release(self):
+        """ Release the lock taken for writing
+        """
+        with self._cond:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        """ Take the lock for writing
+        """
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        """ Release the lock taken for writing
+        """
+        self.release()
+
+    @contextmanager
+    def read(self):
+        """ Context manager taking the lock for reading
+        """
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+
+class GroupCommit():
+    """ Serializes calls to a write function and coalesces them
+    A caller waits for a write started after its call; callers arriving
+    while a write runs share the next one.
+    """
+
+    def __init__(self, write: Callable[[], None]):
+        """ Initialize with the function doing the write
+        """
+        self._write = write
+        self._cond = Condition(Lock())
+        self._requested = 0
+        self._written = 0
+        self._writing = False
+
+    def __call__(self):
+        """ Request a write and wait until it is done
+        """
+        with self._cond:
+            self._requested += 1
+            ticket = self._requested
+            while self._written < ticket:
+                if self._writing:
+                    self._cond.wait()
+                    continue
+                self._writing = True
+                target = self._requested
+                self._cond.release()
+                try:
+                    self._write()
+                except BaseException:
+                    self._cond.acquire()
+                    self._writing = False
+                    self._cond.notify_all()
+                    raise
+                self._cond.acquire()
+                self._writing = False
+                self._written = target
+                self._cond.notify_all()
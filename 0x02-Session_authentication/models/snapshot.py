@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+""" Snapshot module
+Read-only binary snapshot of the objects of a class, opened with mmap
+so that worker processes share its pages through the page cache.
+
+Layout (little endian):
+    header   magic, count, records end, id table, email table, metadata
+    records  sorted by id: u32 JSON length, u16 id length, id, JSON
+    tables   open addressing slots of (u64 key hash, u64 record offset)
+    metadata JSON with the number of objects created per day
+"""
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator, List, TypeVar
+from weakref import WeakValueDictionary
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+
+MAGIC = b'HBSNAP01'
+HEADER = struct.Struct('<8sQQQQQQQQ')
+RECORD = struct.Struct('<IH')
+SLOT = struct.Struct('<QQ')
+
+
+def _hash(value: str) -> int:
+    """ 64 bits hash of an indexed value, never 0
+    """
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+def _table(entries: List[tuple]) -> (bytes, int):
+    """ Build an open addressing table of (hash, offset) entries
+    """
+    slots = 1
+    while slots < 2 * len(entries):
+        slots *= 2
+    table = bytearray(SLOT.size * slots)
+    mask = slots - 1
+    for key_hash, offset in entries:
+        index = key_hash & mask
+        while SLOT.unpack_from(table, index * SLOT.size)[1]:
+            index = (index + 1) & mask
+        SLOT.pack_into(table, index * SLOT.size, key_hash, offset)
+    return bytes(table), slots
+
+
+def write_snapshot(file_path: str, objs: Iterable[TypeVar('Base')]):
+    """ Write the objects to a snapshot file
+    The file is replaced atomically
+    """
+    objs = sorted(objs, key=lambda obj: obj.id)
+    offset = HEADER.size
+    records = []
+    ids = []
+    emails = []
+    per_day = {}
+    for obj in objs:
+        key = obj.id.encode()
+        payload = json.dumps(obj.to_json(True)).encode()
+        records.append(RECORD.pack(len(payload), len(key)))
+        records.append(key)
+        records.append(payload)
+        ids.append((_hash(obj.id), offset))
+        email = getattr(obj, 'email', None)
+        if isinstance(email, str):
+            emails.append((_hash(email), offset))
+        day = obj.created_at.strftime("%Y-%m-%d")
+        per_day[day] = per_day.get(day, 0) + 1
+        offset += RECORD.size + len(key) + len(payload)
+    id_table, id_slots = _table(ids)
+    email_table, email_slots = _table(emails)
+    meta = json.dumps({'created_per_day': per_day}).encode()
+    id_offset = offset
+    email_offset = id_offset + len(id_table)
+    meta_offset = email_offset + len(email_table)
+
+    tmp_path = "{}.tmp".format(file_path)
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(objs), offset, id_offset, id_slots,
+                            email_offset, email_slots, meta_offset,
+                            len(meta)))
+        f.writelines(records)
+        f.write(id_table)
+        f.write(email_table)
+        f.write(meta)
+    os.replace(tmp_path, file_path)
+
+
+class Snapshot(MutableMapping):
+    """ Mapping of object ID to object backed by a snapshot file
+    Records are decoded on access. Saved and removed objects are kept
+    in memory on top of the snapshot, which is never written to.
+    """
+
+    def __init__(self, cls: type, file_path: str):
+        """ Open a snapshot of objects of cls
+        """
+        self.cls = cls
+        with open(file_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self._count, self._records_end, self._id_offset,
+         self._id_slots, self._email_offset, self._email_slots,
+         meta_offset, meta_len) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("{} is not a snapshot".format(file_path))
+        self._meta = json.loads(self._map[meta_offset:meta_offset + meta_len])
+        self._decoded = WeakValueDictionary()
+        self._added = {}
+        self._removed = set()
+        self._size = self._count
+
+    def _offsets(self, table: int, slots: int, value: str) -> Iterator[int]:
+        """ Offsets of the records whose indexed value hashes like value
+        """
+        if slots == 0:
+            return
+        key_hash = _hash(value)
+        mask = slots - 1
+        index = key_hash & mask
+        while True:
+            slot_hash, offset = SLOT.unpack_from(
+                self._map, table + index * SLOT.size)
+            if not offset:
+                return
+            if slot_hash == key_hash:
+                yield offset
+            index = (index + 1) & mask
+
+    def _key_at(self, offset: int) -> str:
+        """ ID of the record at offset
+        """
+        _, key_len = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        return self._map[start:start + key_len].decode()
+
+    def _decode(self, offset: int) -> TypeVar('Base'):
+        """ Object of the record at offset
+        """
+        payload_len, key_len = RECORD.unpack_from(self._map, offset)
+        start = offset + RECORD.size
+        key = self._map[start:start + key_len].decode()
+        obj = self._decoded.get(key)
+        if obj is None:
+            start += key_len
+            obj = self.cls(**json.loads(self._map[start:start + payload_len]))
+            self._decoded[key] = obj
+        return obj
+
+    def _offset(self, key: str) -> int:
+        """ Offset of the record of an ID, None if missing or removed
+        """
+        if not isinstance(key, str) or key in self._removed:
+            return None
+        for offset in self._offsets(self._id_offset, self._id_slots, key):
+            if self._key_at(offset) == key:
+                return offset
+        return None
+
+    def __getitem__(self, key: str) -> TypeVar('Base'):
+        """ Object of an ID
+        """
+        obj = self._added.get(key)
+        if obj is not None:
+            return obj
+        offset = self._offset(key)
+        if offset is None:
+            raise KeyError(key)
+        return self._decode(offset)
+
+    def __contains__(self, key: str) -> bool:
+        """ True if an object has this ID
+        """
+        return key in self._added or self._offset(key) is not None
+
+    def __setitem__(self, key: str, obj: TypeVar('Base')):
+        """ Save an object on top of the snapshot
+        """
+        if key not in self:
+            self._size += 1
+        self._added[key] = obj
+
+    def __delitem__(self, key: str):
+        """ Remove an object
+        """
+        if key not in self:
+            raise KeyError(key)
+        self._added.pop(key, None)
+        if self._offset(key) is not None:
+            self._removed.add(key)
+        self._size -= 1
+
+    def __iter__(self) -> Iterator[str]:
+        """ IDs of the snapshot, in order, then of the saved objects
+        """
+        offset = HEADER.size
+        while offset < self._records_end:
+            payload_len, key_len = RECORD.unpack_from(self._map, offset)
+            start = offset + RECORD.size
+            key = self._map[start:start + key_len].decode()
+            if key not in self._removed and key not in self._added:
+                yield key
+            offset = start + key_len + payload_len
+        yield from list(self._added)
+
+    def __len__(self) -> int:
+        """ Number of objects
+        """
+        return self._size
+
+    def find(self, attributes: dict) -> List[TypeVar('Base')]:
+        """ Objects that may match the attributes, using an index
+        None if no indexed attribute is searched
+        """
+        if 'id' in attributes:
+            obj = self.get(attributes['id'])
+            return [] if obj is None else [obj]
+        if not isinstance(attributes.get('email'), str):
+            return None
+        email = attributes['email']
+        found = [obj for obj in self._added.values()
+                 if getattr(obj, 'email', None) == email]
+        for offset in self._offsets(self._email_offset, self._email_slots,
+                                    email):
+            key = self._key_at(offset)
+            if key not in self._removed and key not in self._added:
+                found.append(self._decode(offset))
+        return found
+
+    def created_per_day(self) -> dict:
+        """ Number of objects of the snapshot created per day
+        """
+        return dict(self._meta['created_per_day'])
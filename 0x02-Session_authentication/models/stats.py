@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+""" Stats module
+"""
+from typing import TypeVar, Iterable
+
+
+class Stats():
+    """ Counters kept up to date as objects are saved and removed
+    Callers hold models.base.STORE_LOCK, for writing while updating
+    them and for reading while reading them.
+    """
+
+    def __init__(self):
+        """ Initialize empty counters
+        """
+        self.counts = {}
+        self.created_per_day = {}
+
+    def reset(self, s_class: str, objs: Iterable[TypeVar('Base')]):
+        """ Recount all objects of a class
+        """
+        self.counts[s_class] = 0
+        self.created_per_day[s_class] = {}
+        for obj in objs:
+            self.added(s_class, obj)
+
+    def load(self, s_class: str, created_per_day: dict):
+        """ Set the counters of a class from its number of objects
+        created per day
+        """
+        self.created_per_day[s_class] = dict(created_per_day)
+        self.counts[s_class] = sum(created_per_day.values())
+
+    def added(self, s_class: str, obj: TypeVar('Base')):
+        """ Count a new object
+        """
+        self.counts[s_class] = self.counts.get(s_class, 0) + 1
+        per_day = self.created_per_day.setdefault(s_class, {})
+        day = obj.created_at.strftime("%Y-%m-%d")
+        per_day[day] = per_day.get(day, 0) + 1
+
+    def removed(self, s_class: str, obj: TypeVar('Base')):
+        """ Uncount a removed object
+        """
+        self.counts[s_class] = self.counts.get(s_class, 0) - 1
+        per_day = self.created_per_day.setdefault(s_class, {})
+        day = obj.created_at.strftime("%Y-%m-%d")
+        per_day[day] = per_day.get(day, 0) - 1
+        if per_day[day] <= 0:
+            del per_day[day]
+
+    def count(self, s_class: str) -> int:
+        """ Number of objects of a class
+        """
+        return self.counts.get(s_class, 0)
+
+    def per_day(self, s_class: str) -> dict:
+        """ Number of objects of a class created per day
+        """
+        return dict(self.created_per_day.get(s_class, {}))
+
+
+STATS = Stats()
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 """ User module
 """
-import hashlib
 from models.base import Base
+from models.hashers import check_password, default_hasher, needs_upgrade
 
 
 class User(Base):
@@ -26,22 +26,29 @@ class User(Base):
 
     @password.setter
     def password(self, pwd: str):
-        """ Setter of a new password: encrypt in SHA256
+        """ Setter of a new password: hashed with the default hasher
+        (PASSWORD_HASHER)
         """
         if pwd is None or type(pwd) is not str:
             self._password = None
         else:
-            self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
+            self._password = default_hasher().encode(pwd)
 
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
+        A hash of a legacy or weaker scheme is replaced by a hash of the
+        default hasher once the password is known to be valid
         """
         if pwd is None or type(pwd) is not str:
             return False
         if self.password is None:
             return False
-        pwd_e = pwd.encode()
-        return hashlib.sha256(pwd_e).hexdigest().lower() == self.password
+        if not check_password(pwd, self.password):
+            return False
+        if needs_upgrade(self.password):
+            self.password = pwd
+            self.save()
+        return True
 
     def display_name(self) -> str:
         """ Display User name based on email/first_name/last_name
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+""" Import/export of the models file store
+Bulk import CSV or JSONL rows into a model class, the store file is
+written once at the end:
+    ./store.py import User ../0x00-personal_data/user_data.csv \\
+        --rename name=first_name
+A "password" column is hashed with the default hasher on a thread
+pool; a "_password" column (as exported) is kept as is. Columns the
+model does not know are dropped.
+Export all objects of a class as JSON lines (to stdout with "-"):
+    ./store.py export User users.jsonl
+Write the mmap snapshot of a class (.db_<Model>.snap):
+    ./store.py snapshot User
+"""
+import argparse
+import csv
+import importlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator
+
+from models.base import Base, DATA
+
+MODEL_MODULES = ['models.user', 'models.user_session']
+BATCH_SIZE = 10000
+
+
+def model_class(name: str) -> type:
+    """ Return the model class named name
+    """
+    for module in MODEL_MODULES:
+        importlib.import_module(module)
+    classes = {cls.__name__: cls for cls in Base.__subclasses__()}
+    if name not in classes:
+        raise SystemExit("unknown model {}, expected one of: {}".format(
+            name, ', '.join(sorted(classes))))
+    return classes[name]
+
+
+def read_rows(file_path: str, fmt: str = None) -> Iterator[dict]:
+    """ Stream the rows of a CSV or JSONL file as dicts
+    """
+    if fmt is None:
+        fmt = 'csv' if file_path.endswith('.csv') else 'jsonl'
+    with open(file_path, newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _renamed(row: dict, rename: dict) -> dict:
+    """ Non-empty columns of a row under their attribute names
+    """
+    return {rename.get(k, k): v for k, v in row.items() if v != ''}
+
+
+def _set_password(obj: Base, password: str):
+    """ Hash and set the password of an object
+    """
+    obj.password = password
+
+
+def import_rows(cls: type, rows: Iterator[dict], rename: dict = {},
+                workers: int = None) -> int:
+    """ Import rows into the store of cls, return the number imported
+    Rows are built and their passwords hashed by batches of
+    BATCH_SIZE, then all objects are saved at once
+    """
+    cls.load_from_file()
+    objs = []
+    rows = iter(rows)
+    with ThreadPoolExecutor(workers) as executor:
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            batch = [_renamed(row, rename) for row in batch]
+            # the password is set afterwards
+            built = [cls(**row) for row in batch]
+            hashed = [(obj, row['password'])
+                      for obj, row in zip(built, batch)
+                      if row.get('password') and '_password' not in row]
+            if hashed and hasattr(cls, 'password'):
+                list(executor.map(_set_password, *zip(*hashed)))
+            objs.extend(built)
+    cls.save_many(objs)
+    return len(objs)
+
+
+def export_rows(cls: type, out) -> int:
+    """ Write the objects of cls as JSON lines, return their number
+    """
+    cls.load_from_file()
+    count = 0
+    for obj in list(DATA[cls.__name__].values()):
+        out.write(json.dumps(obj.to_json(True)))
+        out.write('\n')
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Models store import/export")
+    commands = parser.add_subparsers(dest='command', required=True)
+    importer = commands.add_parser('import', help="import CSV/JSONL rows")
+    importer.add_argument('model')
+    importer.add_argument('file')
+    importer.add_argument('--format', choices=['csv', 'jsonl'],
+                          help="default: from the file extension")
+    importer.add_argument('--rename', action='append', default=[],
+                          metavar='COLUMN=ATTRIBUTE')
+    importer.add_argument('--workers', type=int,
+                          help="password hashing threads")
+    exporter = commands.add_parser('export', help="export as JSONL")
+    exporter.add_argument('model')
+    exporter.add_argument('file', nargs='?', default='-')
+    snapshot = commands.add_parser('snapshot', help="write the snapshot")
+    snapshot.add_argument('model')
+    args = parser.parse_args()
+
+    cls = model_class(args.model)
+    start = time.perf_counter()
+    if args.command == 'import':
+        rename = dict(item.split('=', 1) for item in args.rename)
+        count = import_rows(cls, read_rows(args.file, args.format), rename,
+                            args.workers)
+    elif args.command == 'snapshot':
+        cls.load_from_file()
+        cls.save_snapshot()
+        count = cls.count()
+    elif args.file == '-':
+        count = export_rows(cls, sys.stdout)
+    else:
+        with open(args.file, 'w') as f:
+            count = export_rows(cls, f)
+    elapsed = time.perf_counter() - start
+    print("{}: {} {} in {:.2f}s ({:.0f}/s)".format(
+        args.command, count, cls.__name__, elapsed,
+        count / elapsed if elapsed else 0), file=sys.stderr)
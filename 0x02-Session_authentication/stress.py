@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+""" Multi-threaded stress test of the models store
+Threads search, get, save and remove users concurrently, then the
+store file and the /stats counters are checked against memory.
+Throughput is reported for each thread count:
+    ./stress.py --users 2000 --threads 1,2,4,8,16 --writes 10
+The store files are written in a temporary directory.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+def worker(number: int, ops: int, writes: int, emails: list,
+           errors: list):
+    """ Run ops operations, writes percent of them are saves/removes
+    """
+    from models.user import User
+
+    rand = random.Random(number)
+    mine = []
+    try:
+        for i in range(ops):
+            roll = rand.randrange(100)
+            if roll < writes:
+                if mine and roll % 2:
+                    mine.pop().remove()
+                else:
+                    user = User(email="t{}-{}@hbtn.io".format(number, i))
+                    user.save()
+                    mine.append(user)
+            elif roll < 50:
+                if not User.search({'email': rand.choice(emails)}):
+                    errors.append("user not found")
+            else:
+                User.get(rand.choice(User.sorted_ids()))
+    except Exception as e:
+        errors.append(repr(e))
+
+
+def run(threads: int, ops: int, writes: int, emails: list) -> dict:
+    """ Run the workers, check the file and the counters, return the
+    throughput
+    """
+    from models.base import DATA
+    from models.stats import STATS
+    from models.user import User
+
+    errors = []
+    workers = [threading.Thread(target=worker,
+                                args=(n, ops, writes, emails, errors))
+               for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    with open(".db_User.json") as f:
+        if set(json.load(f)) != set(DATA['User']):
+            errors.append("file and memory differ")
+    per_day = {}
+    for user in DATA['User'].values():
+        day = user.created_at.strftime("%Y-%m-%d")
+        per_day[day] = per_day.get(day, 0) + 1
+    if STATS.count('User') != len(DATA['User']):
+        errors.append("count {} for {} users".format(
+            STATS.count('User'), len(DATA['User'])))
+    if STATS.per_day('User') != per_day:
+        errors.append("users created per day differ")
+    return {
+        'threads': threads,
+        'ops_per_s': round(threads * ops / elapsed),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store stress test")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--threads', default='1,2,4,8,16')
+    parser.add_argument('--ops', type=int, default=500,
+                        help="operations per thread")
+    parser.add_argument('--writes', type=int, default=10,
+                        help="percent of saves/removes")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='store-stress-'))
+    from models.user import User
+    users = [User(email="u{}@hbtn.io".format(i)) for i in range(args.users)]
+    User.save_many(users)
+    emails = [user.email for user in users]
+    for threads in [int(t) for t in args.threads.split(',')]:
+        print(json.dumps(run(threads, args.ops, args.writes, emails)))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+""" Tests of the cost of the metrics when API_METRICS is unset
+Run from the project directory:
+    python -m unittest tests.test_metrics
+"""
+import os
+import tempfile
+import timeit
+import unittest
+
+PATH = '/api/v1/users/me'
+# before_request may cost this much more than the auth steps it runs
+MAX_RATIO = 1.5
+MAX_EXTRA_US = 20
+
+
+def setUpModule():
+    """ Import the app without metrics, its store in a temporary
+    directory
+    """
+    global api, auth, cookie
+    os.environ.pop('API_METRICS', None)
+    os.environ['AUTH_TYPE'] = 'session_auth'
+    os.environ['SESSION_NAME'] = '_my_session_id'
+    os.chdir(tempfile.mkdtemp(prefix='metrics-test-'))
+    import api.v1.app as api
+    from models.user import User
+
+    user = User(email='metrics@hbtn.io')
+    user.password = 'metrics'
+    User.save_many([user])
+    auth = api.auth
+    cookie = '_my_session_id={}'.format(auth.create_session(user.id))
+
+
+def per_call_us(func) -> float:
+    """ Best mean duration of func in microseconds
+    """
+    return min(timeit.repeat(func, number=2000, repeat=5)) / 2000 * 1e6
+
+
+class TestMetricsDisabled(unittest.TestCase):
+    """ The hot path without API_METRICS
+    """
+
+    def test_nothing_wrapped(self):
+        """ No auth step, store operation or view is wrapped
+        """
+        from models.base import Base
+
+        self.assertFalse(api.metrics.enabled)
+        for name in ('require_auth', 'authorization_header',
+                     'session_cookie', 'current_user'):
+            self.assertFalse(hasattr(getattr(auth, name), '__wrapped__'))
+        for name in ('get', 'search', 'save', 'remove'):
+            self.assertFalse(hasattr(getattr(Base, name), '__wrapped__'))
+        for view in api.app.view_functions.values():
+            self.assertFalse(hasattr(view, '__wrapped__'))
+
+    def test_before_request_overhead(self):
+        """ before_request costs about the auth steps it runs
+        """
+        from flask import request
+
+        with api.app.test_request_context(
+                PATH, environ_base={'HTTP_COOKIE': cookie}):
+            def baseline():
+                request.__dict__.pop('_auth_context', None)
+                auth.require_auth(request.path, [])
+                auth.authorization_header(request)
+                auth.session_cookie(request)
+                auth.current_user(request)
+
+            def before_request():
+                request.__dict__.pop('_auth_context', None)
+                api.before_request()
+
+            before_request()
+            self.assertIsNotNone(request.current_user)
+            baseline_us = per_call_us(baseline)
+            before_request_us = per_call_us(before_request)
+        self.assertLess(before_request_us,
+                        baseline_us * MAX_RATIO + MAX_EXTRA_US,
+                        "before_request {:.1f}us, auth steps {:.1f}us".format(
+                            before_request_us, baseline_us))
+
+
+if __name__ == '__main__':
+    unittest.main()
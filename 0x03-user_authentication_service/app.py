@@ -3,9 +3,44 @@
 
 from flask import Flask, jsonify, request, make_response, abort, redirect
 from auth import Auth
+from os import getenv
+from threading import Thread
+import time
+from hashing import HashingBusy
+from rate_limiter import login_limiter
 
 app = Flask(__name__)
 AUTH = Auth()
+RESET_TOKEN_PURGE_INTERVAL = int(getenv("RESET_TOKEN_PURGE_INTERVAL", "600"))
+
+
+def purge_reset_tokens() -> None:
+    """Periodically delete the expired reset tokens."""
+    while True:
+        time.sleep(RESET_TOKEN_PURGE_INTERVAL)
+        try:
+            AUTH.purge_expired_reset_tokens()
+        except Exception:
+            app.logger.exception("reset token purge failed")
+        finally:
+            AUTH.release_db_session()
+
+
+if RESET_TOKEN_PURGE_INTERVAL > 0:
+    Thread(target=purge_reset_tokens, name="reset-token-purge",
+           daemon=True).start()
+
+
+@app.teardown_appcontext
+def release_db_session(exception=None) -> None:
+    """Release the database session used by the request."""
+    AUTH.release_db_session()
+
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(error):
+    """Fail fast with 503 when the password hashing pool is saturated."""
+    return jsonify({"message": "server busy, retry later"}), 503
 
 
 @app.route("/", methods=["GET"], strict_slashes=False)
@@ -36,7 +71,12 @@ def login():
     if not email or not password:
         abort(400)
 
+    throttle_keys = (('email', email), ('ip', request.remote_addr))
+    if not login_limiter.allow(*throttle_keys):
+        abort(429)
+
     if AUTH.valid_login(email, password):
+        login_limiter.refund(*throttle_keys)
         session_id = AUTH.create_session(email)
         if session_id:
             response = jsonify({"email": email, "message": "logged in"})
@@ -2,24 +2,37 @@
 """Auth module provides classes and functions for user authentication."""
 import bcrypt
 from db import DB
+from hashing import HASHING_POOL
+from session_cache import SessionCache, SessionUser
 from user import User
+from datetime import datetime, timedelta
+from os import getenv
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
-import uuid
 from typing import TypeVar, Union
+import hashlib
+import uuid
+
+RESET_TOKEN_TTL = int(getenv("RESET_TOKEN_TTL", "3600"))
 
 
 def _hash_password(password: str) -> bytes:
     """
     Generate a salted hash of the input password using bcrypt.
 
+    The hash runs on the hashing pool, not the request thread.
+
     Args:
         password (str): The password string to hash.
     Returns:
         bytes: The salted hash of the input password.
+    Raises:
+        HashingBusy: the hashing pool is full or the hash timed out.
     """
     password_bytes = password.encode('utf-8')
 
-    hashed_password = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    hashed_password = HASHING_POOL.run(bcrypt.hashpw, password_bytes,
+                                       bcrypt.gensalt())
 
     return hashed_password
 
@@ -29,6 +42,11 @@ def _generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
+def _hash_token(token: str) -> str:
+    """Return the SHA-256 hex digest under which a token is stored."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
 class Auth:
     """
     Auth class to interact with the authentication database.
@@ -36,6 +54,11 @@ class Auth:
 
     def __init__(self):
         self._db = DB()
+        self._session_cache = SessionCache()
+
+    def release_db_session(self) -> None:
+        """Release the database session of the current thread."""
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -49,25 +72,23 @@ class Auth:
         Raises:
             ValueError: if the user already exists.
         """
-        try:
-            existing_user = self._db.find_user_by(email=email)
-            if existing_user:
-                raise ValueError(f"User {email} already exists")
-        except NoResultFound:
-            pass
+        if self._db.email_exists(email):
+            raise ValueError(f"User {email} already exists")
 
         hashed_password = _hash_password(password)
 
-        user = self._db.add_user(email, hashed_password)
-
-        return user
+        try:
+            return self._db.add_user(email, hashed_password)
+        except IntegrityError:
+            raise ValueError(f"User {email} already exists")
 
     def valid_login(self, email: str, password: str) -> bool:
         """Check if login credentials are valid."""
         try:
             user = self._db.find_user_by(email=email)
             if user:
-                return bcrypt.checkpw(
+                return HASHING_POOL.run(
+                    bcrypt.checkpw,
                     password.encode('utf-8'),
                     user.hashed_password
                 )
@@ -77,31 +98,46 @@ class Auth:
 
     def create_session(self, email: str) -> str:
         """Create a session for the user."""
-        try:
-            user = self._db.find_user_by(email=email)
-            session_id = _generate_uuid()
-            self._db.update_user(user.id, session_id=session_id)
-            return session_id
-        except NoResultFound:
+        session_id = _generate_uuid()
+        self._session_cache.invalidate_user(email)
+        updated = self._db.update_user_by({"email": email},
+                                          session_id=session_id)
+        # Again once committed: a lookup that read the old session
+        # before the update cached it in between
+        self._session_cache.invalidate_user(email)
+        if updated == 0:
             return None
+        return session_id
+
+    def get_user_from_session_id(self, session_id: str) -> SessionUser:
+        """
+        Get user from session ID.
+
+        Sessions are looked up in the session cache first.
 
-    def get_user_from_session_id(self, session_id: str) -> User:
-        """Get user from session ID."""
+        Returns:
+            SessionUser: the id and email of the user, None if no user
+                has this session.
+        """
         if not session_id:
             return None
+        user = self._session_cache.get(session_id)
+        if user is not None:
+            return user
+        generation = self._session_cache.generation()
         try:
             user = self._db.find_user_by(session_id=session_id)
-            return user if user else None
         except NoResultFound:
             return None
+        user = SessionUser(user.id, user.email)
+        self._session_cache.put(session_id, user, generation)
+        return user
 
     def destroy_session(self, user_id: int) -> None:
         """Destroy session for user."""
-        try:
-            user = self._db.find_user_by(id=user_id)
-            self._db.update_user(user_id, session_id=None)
-        except NoResultFound:
-            pass
+        self._session_cache.invalidate_user(user_id)
+        self._db.update_user_by({"id": user_id}, session_id=None)
+        self._session_cache.invalidate_user(user_id)
 
     def get_reset_password_token(self, email: str) -> str:
         """
@@ -114,29 +150,41 @@ class Auth:
         Raises:
             ValueError: if no user found with the given email.
         """
-        try:
-            user = self._db.find_user_by(email=email)
-        except NoResultFound:
-            raise ValueError
-
         reset_token = _generate_uuid()
-        self._db.update_user(user.id, reset_token=reset_token)
+        expires_at = datetime.utcnow() + timedelta(seconds=RESET_TOKEN_TTL)
+        if not self._db.add_reset_token(email, _hash_token(reset_token),
+                                        expires_at):
+            raise ValueError
         return reset_token
 
     def update_password(self, reset_token: str, new_password: str) -> None:
         """
         Update user's password using reset token.
 
+        The token is redeemed at most once and only before it expires;
+        redeeming it also revokes the other tokens of the user.
+
         Args:
             reset-token (str): the reset token used to identify the user.
             new_password (str): the new password to be set for the user.
         Raises:
-            ValueError: if the reset token is invalid or user not found.
+            ValueError: if the reset token is invalid, expired or already
+                used.
         """
-        try:
-            user = self._db.find_user_by(reset_token=reset_token)
-            self._db.update_user(user.id,
-                                 hashed_password=_hash_password(new_password),
-                                 reset_token=None)
-        except NoResultFound:
+        if not reset_token or not new_password:
             raise ValueError()
+        token_hash = _hash_token(reset_token)
+        token = self._db.find_reset_token(token_hash)
+        if token is None or token.expires_at < datetime.utcnow():
+            raise ValueError()
+        user_id = token.user_id
+
+        hashed_password = _hash_password(new_password)
+        if not self._db.redeem_reset_token(token_hash, user_id):
+            raise ValueError()
+        self._session_cache.invalidate_user(user_id)
+        self._db.update_user(user_id, hashed_password=hashed_password)
+
+    def purge_expired_reset_tokens(self) -> int:
+        """Delete the expired reset tokens, returns how many were deleted."""
+        return self._db.purge_reset_tokens()
@@ -1,36 +1,64 @@
 #!/usr/bin/env python3
 """DB module
 """
-from sqlalchemy import create_engine
+from os import getenv
+from datetime import datetime
+from sqlalchemy import create_engine, delete, event, exists, insert, literal
+from sqlalchemy import select
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
-from user import Base, User
-from typing import TypeVar
-from sqlalchemy.exc import InvalidRequestError
+from user import Base, ResetToken, User
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, TypeVar
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.orm.exc import NoResultFound
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Configure every new SQLite connection of the pool."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA cache_size=-16000")
+    cursor.close()
+
+
 class DB:
     """DB class
     """
 
     def __init__(self) -> None:
         """Initialize a new DB instance
+
+        The database URL comes from DB_URL (default sqlite:///a.db) and
+        the pool size from DB_POOL_SIZE. Existing data is kept: missing
+        tables and indexes are created.
         """
-        self._engine = create_engine("sqlite:///a.db", echo=False)
-        Base.metadata.drop_all(self._engine)
+        url = getenv("DB_URL", "sqlite:///a.db")
+        options = {"echo": False, "pool_pre_ping": True}
+        pool_size = getenv("DB_POOL_SIZE", "")
+        if pool_size.isdigit() and not url.startswith("sqlite://"):
+            options["pool_size"] = int(pool_size)
+        self._engine = create_engine(url, **options)
+        if self._engine.dialect.name == "sqlite":
+            event.listen(self._engine, "connect", _set_sqlite_pragmas)
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        for index in User.__table__.indexes:
+            index.create(self._engine, checkfirst=True)
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
 
     @property
     def _session(self) -> Session:
-        """Memoized session object
+        """Session object of the current thread
+        """
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Close the session of the current thread, e.g. after a request
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -40,12 +68,101 @@ class DB:
             hashed_password (str): the hashed password of the user.
         Returns:
             User: The user object represent the newly added user.
+        Raises:
+            IntegrityError: the email is already registered, the
+                transaction is rolled back.
         """
         new_user = User(email=email, hashed_password=hashed_password)
         self._session.add(new_user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except IntegrityError:
+            self._session.rollback()
+            raise
         return new_user
 
+    def email_exists(self, email: str) -> bool:
+        """
+        Check whether an email is registered, using the email index only
+        Args:
+            email (str): the email to look for.
+        Returns:
+            bool: True if a user has this email.
+        """
+        return self._session.query(
+            exists().where(User.email == email)).scalar()
+
+    def add_users(self, users: Iterable[Tuple[str, str]],
+                  batch_size: int = 1000) -> Iterator[User]:
+        """
+        Add users to the database in batched transactions
+        Args:
+            users (iterable): (email, hashed_password) pairs.
+            batch_size (int): number of users inserted per transaction.
+        Yields:
+            User: each added user, once its batch is committed.
+        Raises:
+            IntegrityError: a batch holds an already registered email,
+                the batch is rolled back.
+        """
+        batch = []
+        for email, hashed_password in users:
+            batch.append({"email": email, "hashed_password": hashed_password})
+            if len(batch) >= batch_size:
+                yield from self._add_batch(batch)
+                batch = []
+        if batch:
+            yield from self._add_batch(batch)
+
+    def _add_batch(self, batch: List[Dict[str, Any]]) -> List[User]:
+        """Insert a batch of users in one transaction."""
+        session = self._session
+        try:
+            users = session.scalars(insert(User).returning(User),
+                                    batch).all()
+            for user in users:
+                session.expunge(user)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return users
+
+    def find_users_by(self, field: str, values: Iterable[Any],
+                      chunk_size: int = 500) -> Iterator[User]:
+        """
+        Find the users whose field is one of the given values
+        Args:
+            field (str): the column to match.
+            values (iterable): the values to look for.
+            chunk_size (int): number of values per IN query.
+        Returns:
+            iterator: the matching users.
+        Raises:
+            ValueError: an invalid user attribute is provided.
+        """
+        if field not in User.__table__.columns:
+            raise ValueError(f"Invalid user attribute: {field}")
+        return self._find_users_by(getattr(User, field), values,
+                                   chunk_size)
+
+    def _find_users_by(self, column, values: Iterable[Any],
+                       chunk_size: int) -> Iterator[User]:
+        """
+        Query the users whose column is one of the values, by chunks
+        Yields:
+            User: each matching user.
+        """
+        chunk = []
+        for value in values:
+            chunk.append(value)
+            if len(chunk) >= chunk_size:
+                yield from self._session.query(User).filter(
+                    column.in_(chunk))
+                chunk = []
+        if chunk:
+            yield from self._session.query(User).filter(column.in_(chunk))
+
     def find_user_by(self, **kwargs) -> User:
         """
         Find a user by arbitrary keyword arguments.
@@ -72,18 +189,108 @@ class DB:
             user_id (int): the ID of the user to update
             **kwargs: arbitrary keyword arguments torepresent user attribute
         Raises:
-            ValueError: an invalid user attribute is provided.
+            ValueError: an invalid user attribute is provided or no user
+                has the given ID.
         """
-        try:
-            user = self.find_user_by(id=user_id)
-        except NoResultFound:
+        if self.update_user_by({"id": user_id}, **kwargs) == 0:
             raise ValueError("User not found")
 
-        for key in kwargs:
-            if not hasattr(user, key):
+    def update_user_by(self, filters: Dict[str, Any], **kwargs) -> int:
+        """
+        Update the users matching some filters with a single UPDATE
+        Args:
+            filters (dict): column values the users must match.
+            **kwargs: column values to set.
+        Returns:
+            int: the number of updated users.
+        Raises:
+            ValueError: an invalid user attribute is provided or filters
+                is empty.
+        """
+        if not filters:
+            raise ValueError("No filter given")
+        columns = User.__table__.columns
+        for key in list(filters) + list(kwargs):
+            if key not in columns:
                 raise ValueError(f"Invalid user attribute: {key}")
+        if not kwargs:
+            return self._session.query(User).filter_by(**filters).count()
+
+        count = self._session.query(User).filter_by(**filters).update(
+            kwargs, synchronize_session=False)
+        self._session.commit()
+        return count
+
+    def add_reset_token(self, email: str, token_hash: str,
+                        expires_at: datetime) -> bool:
+        """
+        Store a reset token for the user with the given email
+        The user ID is resolved by the INSERT ... SELECT itself.
+        Args:
+            email (str): the email of the user.
+            token_hash (str): the SHA-256 hex digest of the token.
+            expires_at (datetime): when the token expires.
+        Returns:
+            bool: False if no user has this email.
+        """
+        now = datetime.utcnow()
+        query = select(User.id, literal(token_hash), literal(now),
+                       literal(expires_at)).where(User.email == email)
+        result = self._session.execute(
+            insert(ResetToken).from_select(
+                ["user_id", "token_hash", "created_at", "expires_at"],
+                query))
+        self._session.commit()
+        return result.rowcount > 0
 
-        for key, value in kwargs.items():
-            setattr(user, key, value)
+    def find_reset_token(self, token_hash: str) -> ResetToken:
+        """
+        Find a reset token by its hash
+        Args:
+            token_hash (str): the SHA-256 hex digest of the token.
+        Returns:
+            ResetToken: the token, None if unknown.
+        """
+        return self._session.get(ResetToken, token_hash)
 
+    def redeem_reset_token(self, token_hash: str, user_id: int) -> bool:
+        """
+        Delete a reset token and every other token of its user in one
+        transaction, used to redeem it exactly once
+        Args:
+            token_hash (str): the SHA-256 hex digest of the token.
+            user_id (int): the ID of the user owning the token.
+        Returns:
+            bool: False if the token was already deleted.
+        """
+        result = self._session.execute(
+            delete(ResetToken).where(ResetToken.token_hash == token_hash))
+        if result.rowcount == 0:
+            self._session.rollback()
+            return False
+        self._session.execute(
+            delete(ResetToken).where(ResetToken.user_id == user_id))
         self._session.commit()
+        return True
+
+    def purge_reset_tokens(self, batch_size: int = 1000) -> int:
+        """
+        Delete expired reset tokens in batches
+        Args:
+            batch_size (int): number of tokens deleted per transaction.
+        Returns:
+            int: the number of deleted tokens.
+        """
+        now = datetime.utcnow()
+        total = 0
+        while True:
+            # MySQL rejects LIMIT in an IN subquery, select the batch first
+            batch = self._session.scalars(
+                select(ResetToken.token_hash).where(
+                    ResetToken.expires_at < now).limit(batch_size)).all()
+            if batch:
+                total += self._session.execute(delete(ResetToken).where(
+                    ResetToken.token_hash.in_(batch))).rowcount
+            self._session.commit()
+            if len(batch) < batch_size:
+                return total
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Hashing module runs password hashing on a bounded thread pool."""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from os import cpu_count, getenv
+from threading import BoundedSemaphore
+from typing import Any, Callable
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool is full or a hash timed out."""
+
+
+class HashingPool:
+    """
+    Bounded executor for CPU-heavy password hashing.
+
+    bcrypt releases the GIL, so hashes run in parallel on the pool
+    threads. At most `workers + queue_size` hashes are in flight; extra
+    calls fail fast with HashingBusy instead of queueing up behind a
+    burst of logins.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None,
+                 timeout: float = None) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            workers (int): hashing threads, HASH_WORKERS or the CPU count.
+            queue_size (int): hashes waiting for a thread, HASH_QUEUE_SIZE
+                or 4 per worker.
+            timeout (float): seconds a caller waits for its hash,
+                HASH_TIMEOUT or 10.
+        """
+        if workers is None:
+            workers = int(getenv("HASH_WORKERS", "0")) or cpu_count() or 1
+        if queue_size is None:
+            queue_size = int(getenv("HASH_QUEUE_SIZE", str(4 * workers)))
+        if timeout is None:
+            timeout = float(getenv("HASH_TIMEOUT", "10"))
+        self.timeout = timeout
+        self._slots = BoundedSemaphore(workers + queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="hashing")
+
+    def run(self, func: Callable, *args: Any,
+            timeout: float = None) -> Any:
+        """
+        Run a hashing function on the pool and wait for its result.
+
+        Args:
+            func (callable): the hashing function.
+            *args: the arguments of the function.
+            timeout (float): seconds to wait, the pool timeout by default.
+        Returns:
+            The result of the function.
+        Raises:
+            HashingBusy: the pool is full or the hash timed out.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("hashing pool is full")
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        try:
+            return future.result(self.timeout if timeout is None
+                                 else timeout)
+        except TimeoutError:
+            # drop the hash if it hasn't started, its slot is released
+            future.cancel()
+            raise HashingBusy("hashing timed out")
+
+
+HASHING_POOL = HashingPool()
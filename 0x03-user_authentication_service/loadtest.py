@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Load test module replays the main.py flows at configurable concurrency.
+
+Usage:
+    ./loadtest.py [--url http://0.0.0.0:5000] [--concurrency 8]
+                  [--iterations 20] [--mix full=1,login=2,profile=7]
+                  [--registrations N] [--json results.json]
+
+Without --url the Flask app is driven in-process through its test
+client; with --url a live server is used. Throughput and p50/p95/p99
+latencies are reported per endpoint. All in-process workers share one
+client IP, so raise LOGIN_RATE_LIMIT for runs with many "full" flows.
+
+With --registrations N every worker registers the same N emails in its
+own order instead, and the run fails if an email was created more than
+once (or, in-process, is held by more than one row).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+PASSWD = "b4l0u"
+NEW_PASSWD = "t4rt1fl3tt3"
+
+
+class TestClientTransport:
+    """Sends requests to the app through the Flask test client."""
+
+    def __init__(self) -> None:
+        """Create a test client with its own cookie jar."""
+        from app import app
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, data: dict = None,
+                cookies: dict = None) -> Tuple[int, dict, dict]:
+        """
+        Send a request.
+
+        Returns:
+            tuple: status code, JSON payload (or None) and cookies set.
+        """
+        for name, value in (cookies or {}).items():
+            self._client.set_cookie(name, value)
+        response = self._client.open(path, method=method, data=data)
+        if not cookies:
+            self._client.delete_cookie("session_id")
+        set_cookies = {}
+        for header in response.headers.getlist("Set-Cookie"):
+            name, _, rest = header.partition("=")
+            set_cookies[name] = rest.split(";", 1)[0]
+        return response.status_code, response.get_json(silent=True), \
+            set_cookies
+
+
+class HttpTransport:
+    """Sends requests to a live server."""
+
+    def __init__(self, base_url: str) -> None:
+        """Create an HTTP session for the given server."""
+        import requests
+        self._base_url = base_url.rstrip("/")
+        self._session = requests.Session()
+
+    def request(self, method: str, path: str, data: dict = None,
+                cookies: dict = None) -> Tuple[int, dict, dict]:
+        """
+        Send a request.
+
+        Returns:
+            tuple: status code, JSON payload (or None) and cookies set.
+        """
+        response = self._session.request(
+            method, self._base_url + path, data=data, cookies=cookies,
+            allow_redirects=False)
+        self._session.cookies.clear()
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        return response.status_code, payload, response.cookies.get_dict()
+
+
+class Recorder:
+    """Collects latencies per endpoint."""
+
+    def __init__(self) -> None:
+        """Initialize empty samples."""
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def call(self, transport, endpoint: str, expected: Tuple[int, ...],
+             data: dict = None, cookies: dict = None) -> Tuple[dict, dict]:
+        """
+        Time one request and check its status code.
+
+        Args:
+            transport: the transport sending the request.
+            endpoint (str): "<METHOD> <path>".
+            expected (tuple): accepted status codes.
+        Returns:
+            tuple: JSON payload and cookies set by the response.
+        """
+        method, path = endpoint.split(" ", 1)
+        start = time.perf_counter()
+        status, payload, set_cookies = transport.request(
+            method, path, data, cookies)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(elapsed)
+            if status not in expected:
+                key = "{} -> {}".format(endpoint, status)
+                self.errors[key] = self.errors.get(key, 0) + 1
+        return payload or {}, set_cookies
+
+    def report(self, duration: float) -> Dict[str, dict]:
+        """
+        Summarize the samples.
+
+        Args:
+            duration (float): wall-clock duration of the run.
+        Returns:
+            dict: per endpoint count, req/s and p50/p95/p99 in ms.
+        """
+        report = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            report[endpoint] = {
+                "count": len(samples),
+                "rps": round(len(samples) / duration, 1),
+                "p50_ms": _percentile(samples, 50),
+                "p95_ms": _percentile(samples, 95),
+                "p99_ms": _percentile(samples, 99),
+            }
+        return report
+
+
+def _percentile(samples: List[float], percent: int) -> float:
+    """Return a percentile of sorted samples in milliseconds."""
+    index = min(len(samples) - 1, int(len(samples) * percent / 100))
+    return round(samples[index] * 1000, 2)
+
+
+def full_flow(transport, recorder: Recorder, email: str) -> None:
+    """The main.py flow: register, log in/out, reset the password."""
+    recorder.call(transport, "POST /users", (200,),
+                  {"email": email, "password": PASSWD})
+    recorder.call(transport, "POST /sessions", (401,),
+                  {"email": email, "password": NEW_PASSWD})
+    recorder.call(transport, "GET /profile", (403,))
+    _, cookies = recorder.call(transport, "POST /sessions", (200,),
+                               {"email": email, "password": PASSWD})
+    session = {"session_id": cookies.get("session_id", "")}
+    recorder.call(transport, "GET /profile", (200,), cookies=session)
+    recorder.call(transport, "DELETE /sessions", (200, 302),
+                  cookies=session)
+    payload, _ = recorder.call(transport, "POST /reset_password", (200,),
+                               {"email": email})
+    recorder.call(transport, "PUT /reset_password", (200,),
+                  {"email": email, "reset_token": payload.get("reset_token"),
+                   "new_password": NEW_PASSWD})
+    recorder.call(transport, "POST /sessions", (200,),
+                  {"email": email, "password": NEW_PASSWD})
+
+
+def login_flow(transport, recorder: Recorder, email: str) -> None:
+    """Log a registered user in, read the profile and log out."""
+    _, cookies = recorder.call(transport, "POST /sessions", (200,),
+                               {"email": email, "password": PASSWD})
+    session = {"session_id": cookies.get("session_id", "")}
+    recorder.call(transport, "GET /profile", (200,), cookies=session)
+    recorder.call(transport, "DELETE /sessions", (200, 302),
+                  cookies=session)
+
+
+def profile_flow(transport, recorder: Recorder, session_id: str) -> None:
+    """Read the profile of a logged in user."""
+    recorder.call(transport, "GET /profile", (200,),
+                  cookies={"session_id": session_id})
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """Parse "full=1,login=2,profile=7" into flow weights."""
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ("full", "login", "profile"):
+            raise ValueError("unknown flow: {}".format(name))
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def run(transport_factory: Callable, concurrency: int, iterations: int,
+        mix: Dict[str, int]) -> Dict[str, dict]:
+    """
+    Run the flows from concurrent workers.
+
+    Args:
+        transport_factory (callable): creates one transport per worker.
+        concurrency (int): number of worker threads.
+        iterations (int): flows run by each worker.
+        mix (dict): flow name -> weight.
+    Returns:
+        dict: the per endpoint report.
+    """
+    recorder = Recorder()
+    setup = transport_factory()
+    run_id = uuid.uuid4().hex[:8]
+    email = "load-{}@example.com".format(run_id)
+    setup.request("POST", "/users", {"email": email, "password": PASSWD})
+    _, _, cookies = setup.request("POST", "/sessions",
+                                  {"email": email, "password": PASSWD})
+    session_id = cookies.get("session_id", "")
+    flows = [name for name, weight in mix.items() for _ in range(weight)]
+
+    def worker(number: int) -> None:
+        transport = transport_factory()
+        rand = random.Random(number)
+        login_email = "load-{}-{}@example.com".format(run_id, number)
+        if "login" in flows:
+            transport.request("POST", "/users",
+                              {"email": login_email, "password": PASSWD})
+        for i in range(iterations):
+            flow = rand.choice(flows)
+            if flow == "full":
+                full_flow(transport, recorder, "load-{}-{}-{}@example.com"
+                          .format(run_id, number, i))
+            elif flow == "login":
+                login_flow(transport, recorder, login_email)
+            else:
+                profile_flow(transport, recorder, session_id)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,))
+               for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    report = recorder.report(duration)
+    report["total"] = {
+        "count": sum(len(s) for s in recorder.samples.values()),
+        "rps": round(sum(len(s) for s in recorder.samples.values())
+                     / duration, 1),
+        "duration_s": round(duration, 2),
+        "errors": recorder.errors,
+    }
+    return report
+
+
+def register_race(transport_factory: Callable, concurrency: int,
+                  count: int) -> Dict[str, dict]:
+    """
+    Register the same emails from concurrent workers.
+
+    Args:
+        transport_factory (callable): creates one transport per worker.
+        concurrency (int): number of worker threads.
+        count (int): number of emails every worker registers.
+    Returns:
+        dict: the per endpoint report, its "total" lists the emails
+        created more than once under "duplicates".
+    """
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+    emails = ["race-{}-{}@example.com".format(run_id, i)
+              for i in range(count)]
+    created = {email: 0 for email in emails}
+    lock = threading.Lock()
+
+    def worker(number: int) -> None:
+        transport = transport_factory()
+        order = list(emails)
+        random.Random(number).shuffle(order)
+        for email in order:
+            payload, _ = recorder.call(transport, "POST /users", (200, 400),
+                                       {"email": email, "password": PASSWD})
+            if payload.get("message") == "user created":
+                with lock:
+                    created[email] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,))
+               for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    duplicates = {email: "{} created".format(n)
+                  for email, n in created.items() if n > 1}
+    if transport_factory is TestClientTransport:
+        from app import AUTH
+        rows = {}
+        for user in AUTH._db.find_users_by("email", emails):
+            rows[user.email] = rows.get(user.email, 0) + 1
+        duplicates.update((email, "{} rows".format(n))
+                          for email, n in rows.items() if n > 1)
+    report = recorder.report(duration)
+    report["total"] = {
+        "count": sum(len(s) for s in recorder.samples.values()),
+        "rps": round(sum(len(s) for s in recorder.samples.values())
+                     / duration, 1),
+        "duration_s": round(duration, 2),
+        "errors": recorder.errors,
+        "duplicates": duplicates,
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="live server, e.g. "
+                        "http://0.0.0.0:5000 (default: in-process)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=20,
+                        help="flows per worker")
+    parser.add_argument("--mix", default="full=1,login=2,profile=7")
+    parser.add_argument("--registrations", type=int,
+                        help="race the registration of this many emails "
+                        "instead of running the mix")
+    parser.add_argument("--json", help="also write the report to a file")
+    args = parser.parse_args()
+
+    if args.url:
+        def factory():
+            return HttpTransport(args.url)
+    else:
+        factory = TestClientTransport
+    if args.registrations:
+        results = register_race(factory, args.concurrency,
+                                args.registrations)
+    else:
+        results = run(factory, args.concurrency, args.iterations,
+                      parse_mix(args.mix))
+
+    print("{:<24}{:>8}{:>10}{:>10}{:>10}{:>10}".format(
+        "endpoint", "count", "req/s", "p50 ms", "p95 ms", "p99 ms"))
+    for name, row in results.items():
+        if name != "total":
+            print("{:<24}{:>8}{:>10}{:>10}{:>10}{:>10}".format(
+                name, row["count"], row["rps"], row["p50_ms"],
+                row["p95_ms"], row["p99_ms"]))
+    total = results["total"]
+    print("total: {} requests in {}s, {} req/s, errors: {}".format(
+        total["count"], total["duration_s"], total["rps"],
+        total["errors"] or "none"))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if total.get("duplicates"):
+        raise SystemExit("duplicate registrations: {}".format(
+            total["duplicates"]))
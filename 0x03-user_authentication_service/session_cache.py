@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Session cache module maps session IDs to lightweight users."""
+from collections import OrderedDict, namedtuple
+from os import getenv
+from threading import Lock
+import time
+
+
+SessionUser = namedtuple("SessionUser", ["id", "email"])
+
+
+class SessionCache:
+    """
+    Bounded LRU cache of session ID -> SessionUser with a TTL.
+
+    Entries are also indexed by user ID and email so that a user's
+    cached session can be dropped when the session changes. Every
+    invalidation bumps a generation recorded for the user, so a lookup
+    that read the database before an invalidation does not cache its
+    stale result afterwards (see put).
+    """
+
+    def __init__(self, max_size: int = None, ttl: float = None) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            max_size (int): maximum number of sessions kept,
+                SESSION_CACHE_SIZE or 10000.
+            ttl (float): seconds an entry stays valid,
+                SESSION_CACHE_TTL or 60.
+        """
+        if max_size is None:
+            max_size = int(getenv("SESSION_CACHE_SIZE", "10000"))
+        if ttl is None:
+            ttl = float(getenv("SESSION_CACHE_TTL", "60"))
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._session_of = {}
+        self._generation = 0
+        self._invalidated_at = {}
+        self._lock = Lock()
+
+    def generation(self) -> int:
+        """
+        Get the current invalidation generation, to be read before
+        looking a session up in the database and passed to put().
+
+        Returns:
+            int: the generation.
+        """
+        with self._lock:
+            return self._generation
+
+    def get(self, session_id: str) -> SessionUser:
+        """
+        Get the cached user of a session.
+
+        Args:
+            session_id (str): the session ID.
+        Returns:
+            SessionUser: the cached user, None if missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                self._drop(session_id)
+                return None
+            self._entries.move_to_end(session_id)
+            return user
+
+    def put(self, session_id: str, user: SessionUser,
+            generation: int) -> None:
+        """
+        Cache the user of a session, unless the user was invalidated
+        since the generation was read.
+
+        Args:
+            session_id (str): the session ID.
+            user (SessionUser): the user owning the session.
+            generation (int): the generation read before the lookup.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if any(self._invalidated_at.get(key, 0) > generation
+                   for key in (user.id, user.email)):
+                return
+            self._invalidate_user(user.id, user.email)
+            self._drop(session_id)
+            self._entries[session_id] = (user,
+                                         time.monotonic() + self.ttl)
+            self._session_of[user.id] = session_id
+            self._session_of[user.email] = session_id
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_user(self, *keys) -> None:
+        """
+        Drop the cached session of a user.
+
+        Args:
+            *keys: the user ID and/or email.
+        """
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._invalidated_at[key] = self._generation
+            self._invalidate_user(*keys)
+
+    def _invalidate_user(self, *keys) -> None:
+        """Drop the cached session of a user, the lock being held."""
+        for key in keys:
+            session_id = self._session_of.get(key)
+            if session_id is not None:
+                self._drop(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        """Remove a session and its user index entries."""
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        user = entry[0]
+        for key in (user.id, user.email):
+            if self._session_of.get(key) == session_id:
+                del self._session_of[key]
@@ -3,7 +3,7 @@
 User Model Module
 """
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -17,7 +17,24 @@ class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250), nullable=True)
+    session_id = Column(String(250), nullable=True, index=True)
     reset_token = Column(String(250), nullable=True)
+
+
+class ResetToken(Base):
+    """
+    Reset token model class representing the reset_tokens table.
+
+    Only the SHA-256 hex digest of a token is stored; it is the primary
+    key, so redeeming a token is a single primary key lookup.
+    """
+
+    __tablename__ = 'reset_tokens'
+
+    token_hash = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)